@@ -0,0 +1,100 @@
+"""Latency and throughput of the main interaction handlers
+
+Drives /verify, /files, /download, the per-file button and Download All
+with synthetic interactions against a local fake Patreon API and file host,
+and reports p50/p95/p99 total time, time to first response and ops/s.
+
+    python -m benchmarks.bench_handlers --concurrency 20 --iterations 200
+"""
+import argparse
+import asyncio
+import sys
+
+from benchmarks.fakes import FakeUpstream
+from benchmarks.harness import Bench, quiet, run_concurrently, format_row
+from utils.codec import codec
+from utils.runtime import install_event_loop
+
+
+OPERATIONS = ('verify', 'files', 'download', 'download_file', 'download_all')
+
+
+async def bench_operation(bench: Bench, op: str, iterations: int, concurrency: int) -> float:
+    import cogs.Patreon as patreon
+    cog = bench.cog
+    upstream = bench.upstream
+
+    # A fresh user per call keeps rate limits and the bulk guard out of the numbers
+    if op == 'verify':
+        users = [bench.new_user() for _ in range(iterations)]
+    else:
+        users = await bench.new_patrons(iterations)
+
+    def job(i: int):
+        user = users[i]
+        it = bench.interaction(user)
+        if op == 'verify':
+            email = upstream.email_for(i % upstream.member_count)
+            handler = cog.verify.callback(cog, it, email)
+        elif op == 'files':
+            handler = cog.files.callback(cog, it)
+        else:
+            files = cog.get_files_for_tiers([upstream.tier_for(i)])
+            if op == 'download':
+                handler = cog.download_cmd.callback(cog, it, files[0].name)
+            elif op == 'download_file':
+                button = patreon.FileDownloadButton(files[0], 0, cog.catalog_version)
+                handler = button.callback(it)
+            else:
+                button = patreon.DownloadAllButton(len(files), cog.catalog_version)
+                handler = button.callback(it)
+        return bench.measure(op, it, handler)
+
+    return await run_concurrently([lambda i=i: job(i) for i in range(iterations)], concurrency)
+
+
+async def main(args) -> int:
+    upstream = FakeUpstream(
+        tiers=args.tiers,
+        member_count=args.members,
+        page_size=args.page_size,
+        page_latency=args.page_latency / 1000,
+        file_size=args.file_size * 1024,
+        file_latency=args.file_latency / 1000
+    )
+    bench = await Bench(upstream).start()
+
+    try:
+        print(f"loop={type(asyncio.get_running_loop()).__module__} codec={codec.name}")
+        print(f"members={args.members} page_size={args.page_size} concurrency={args.concurrency} iterations={args.iterations}")
+        for op in args.ops:
+            with quiet():
+                elapsed = await bench_operation(bench, op, args.iterations, args.concurrency)
+            print(format_row(f"{op}.total", bench.stats, elapsed))
+            print(format_row(f"{op}.first_response", bench.stats))
+            errors = bench.stats.counters.get(f"{op}.errors")
+            if errors:
+                print(f"{op}: {errors} errors")
+        print(f"upstream requests: {upstream.requests}")
+    finally:
+        await bench.close()
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ops', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--members', type=int, default=1000, help="patrons in the fake campaign")
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--page-latency', type=float, default=50, help="ms per member page")
+    parser.add_argument('--file-size', type=int, default=256, help="KB per file")
+    parser.add_argument('--file-latency', type=float, default=20, help="ms per file download")
+    parser.add_argument('--tiers', nargs='+', default=['Gladiator Priest', 'Advanced Mage', 'AIO PvE and PvP'])
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    install_event_loop()
+    sys.exit(asyncio.run(main(parse_args())))
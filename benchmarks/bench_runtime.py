@@ -0,0 +1,102 @@
+"""Default runtime vs PERF_RUNTIME (uvloop + orjson)
+
+Times the JSON codecs on a Patreon member page and on the user store, then
+runs the handler benchmark once per mode in a subprocess, since the loop
+and codec are picked at import.
+
+    python -m benchmarks.bench_runtime --users 20000 --iterations 100
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from utils.codec import CODECS
+
+
+def member_page(count: int) -> dict:
+    """A Patreon members page shaped like the real API's"""
+    return {
+        'data': [{
+            'id': f"member{i}",
+            'type': 'member',
+            'attributes': {'email': f"patron{i}@example.com", 'full_name': f"Patron {i}", 'patron_status': 'active_patron'},
+            'relationships': {'currently_entitled_tiers': {'data': [{'id': str(i % 14), 'type': 'tier'}]}}
+        } for i in range(count)],
+        'included': [{'id': str(i), 'type': 'tier', 'attributes': {'title': f"Tier {i}", 'amount_cents': 500}} for i in range(14)],
+        'meta': {'pagination': {'total': count, 'cursors': {'next': 'abc'}}}
+    }
+
+
+def user_store(count: int) -> dict:
+    """user_data.json with `count` verified users"""
+    return {
+        str(10 ** 17 + i): {
+            'discord_id': 10 ** 17 + i,
+            'email': f"patron{i}@example.com",
+            'tiers': ['Gladiator Priest', 'Advanced Mage'],
+            'verified_at': '2026-01-01T00:00:00'
+        } for i in range(count)
+    }
+
+
+def best_of(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def bench_codecs(args):
+    documents = {
+        f"members page ({args.page_size})": member_page(args.page_size),
+        f"user store ({args.users})": user_store(args.users),
+    }
+    for label, document in documents.items():
+        for name, codec_class in CODECS.items():
+            try:
+                codec = codec_class()
+            except ImportError:
+                print(f"{label:<28} {name:<8} not installed")
+                continue
+            encoded = codec.encode(document, indent=True)
+            decode = best_of(lambda: codec.loads(encoded), args.repeat)
+            encode = best_of(lambda: codec.encode(document, indent=True), args.repeat)
+            print(f"{label:<28} {name:<8} decode={decode * 1000:8.2f}ms encode={encode * 1000:8.2f}ms size={len(encoded) // 1024}KB")
+
+
+def bench_modes(args):
+    for label, env in (('default', {'PERF_RUNTIME': ''}), ('PERF_RUNTIME', {'PERF_RUNTIME': '1'})):
+        print(f"\n--- handlers, {label} ---", flush=True)
+        subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_handlers',
+             '--iterations', str(args.iterations), '--concurrency', str(args.concurrency),
+             '--ops', 'verify', 'files', 'download'],
+            env={**os.environ, **env},
+            check=False
+        )
+
+
+def main(args) -> int:
+    bench_codecs(args)
+    if not args.codecs_only:
+        bench_modes(args)
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=20000, help="records in the user store")
+    parser.add_argument('--page-size', type=int, default=100, help="members per Patreon page")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--codecs-only', action='store_true')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args()))
@@ -0,0 +1,263 @@
+"""Fake Patreon / GitFront server and fake Discord objects for benchmarks"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import discord
+from aiohttp import web
+
+
+class FakeUpstream:
+    """aiohttp server standing in for the Patreon API and GitFront raw files
+
+    `member_count` patrons are spread over `tiers`, served `page_size` per
+    page with `page_latency` seconds of delay. Every file is `file_size`
+    bytes and is served with `file_latency` seconds of delay.
+    """
+    def __init__(self, tiers: List[str], member_count: int = 1000, page_size: int = 100,
+                 page_latency: float = 0.05, file_size: int = 256 * 1024, file_latency: float = 0.02):
+        self.tiers = tiers
+        self.member_count = member_count
+        self.page_size = page_size
+        self.page_latency = page_latency
+        self.file_size = file_size
+        self.file_latency = file_latency
+        self.requests: Dict[str, int] = {'campaigns': 0, 'campaign': 0, 'members': 0, 'files': 0}
+        self._runner: Optional[web.AppRunner] = None
+        self.base_url = ''
+
+    def email_for(self, index: int) -> str:
+        return f"patron{index}@example.com"
+
+    def tier_for(self, index: int) -> str:
+        return self.tiers[index % len(self.tiers)]
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get('/api/oauth2/v2/campaigns', self._campaigns)
+        app.router.add_get('/api/oauth2/v2/campaigns/{campaign_id}', self._campaign)
+        app.router.add_get('/api/oauth2/v2/campaigns/{campaign_id}/members', self._members)
+        app.router.add_get('/raw/{name}', self._file)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _campaigns(self, request: web.Request) -> web.Response:
+        self.requests['campaigns'] += 1
+        included = self._tiers(request) if 'tiers' in request.query.get('include', '') else []
+        return web.json_response({'data': [{'id': '1000', 'type': 'campaign', 'attributes': {'creation_name': 'Bench'}}], 'included': included})
+
+    def _tiers(self, request: web.Request) -> List[dict]:
+        """Included tiers, with only the attributes asked for like the real API"""
+        fields = [f for f in request.query.get('fields[tier]', '').split(',') if f]
+        attributes = {'title': None, 'amount_cents': 500}
+        return [{
+            'id': str(idx), 'type': 'tier',
+            'attributes': {f: title if f == 'title' else attributes.get(f) for f in fields}
+        } for idx, title in enumerate(self.tiers)]
+
+    async def _campaign(self, request: web.Request) -> web.Response:
+        self.requests['campaign'] += 1
+        included = self._tiers(request) if 'tiers' in request.query.get('include', '') else []
+        campaign = {'id': request.match_info['campaign_id'], 'type': 'campaign', 'attributes': {'creation_name': 'Bench'}}
+        return web.json_response({'data': campaign, 'included': included})
+
+    async def _members(self, request: web.Request) -> web.Response:
+        self.requests['members'] += 1
+        await asyncio.sleep(self.page_latency)
+        start = int(request.query.get('page[cursor]', 0))
+        end = min(start + int(request.query.get('page[count]', self.page_size)), self.member_count)
+        fields = [f for f in request.query.get('fields[member]', '').split(',') if f]
+
+        members = []
+        for i in range(start, end):
+            attributes = {'email': self.email_for(i), 'full_name': f"Patron {i}", 'patron_status': 'active_patron'}
+            members.append({
+                'id': f"member{i}",
+                'type': 'member',
+                'attributes': {f: attributes.get(f) for f in fields},
+                'relationships': {'currently_entitled_tiers': {'data': [{'id': str(i % len(self.tiers)), 'type': 'tier'}]}}
+            })
+        included = self._tiers(request)
+
+        cursors = {'next': str(end) if end < self.member_count else None}
+        return web.json_response({'data': members, 'included': included, 'meta': {'pagination': {'total': self.member_count, 'cursors': cursors}}})
+
+    async def _file(self, request: web.Request) -> web.Response:
+        self.requests['files'] += 1
+        await asyncio.sleep(self.file_latency)
+        body = (request.match_info['name'].encode() + b'\n') * (self.file_size // (len(request.match_info['name']) + 1))
+        return web.Response(body=body, content_type='text/plain')
+
+
+def _close_files(kwargs: dict):
+    """Uploads are never sent, just release the file handles"""
+    files = list(kwargs.get('files') or []) + list(kwargs.get('attachments') or [])
+    if kwargs.get('file') is not None:
+        files.append(kwargs['file'])
+    for file in files:
+        if isinstance(file, discord.File):
+            file.close()
+
+
+class FakeDM:
+    def __init__(self, user: 'FakeUser'):
+        self.user = user
+        self.id = user.id + 1
+        self.sent = 0
+
+    async def send(self, content: Optional[str] = None, **kwargs):
+        await self.user.client.api_call()
+        _close_files(kwargs)
+        self.sent += 1
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int = 1):
+        self.id = guild_id
+        self.filesize_limit = 25 * 1024 * 1024
+        self.roles = []
+        self.members: Dict[int, 'FakeUser'] = {}
+
+    def get_member(self, user_id: int):
+        return self.members.get(user_id)
+
+
+class FakeUser:
+    def __init__(self, client: 'FakeClient', user_id: int, guild: Optional[FakeGuild] = None):
+        self.client = client
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.mention = f"<@{user_id}>"
+        self.bot = False
+        self.roles = []
+        self.guild = guild
+        self.guild_permissions = discord.Permissions.none()
+        self.dm = FakeDM(self)
+
+    async def create_dm(self) -> FakeDM:
+        return self.dm
+
+    async def send(self, content: Optional[str] = None, **kwargs):
+        await self.dm.send(content, **kwargs)
+
+
+class FakeResponse:
+    def __init__(self, interaction: 'FakeInteraction'):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self):
+        if self._done:
+            raise RuntimeError("Interaction already responded to")
+        self._done = True
+        await self.interaction.client.api_call()
+        self.interaction.responded_at = time.perf_counter()
+
+    async def defer(self, **kwargs):
+        await self._respond()
+
+    async def send_message(self, content: Optional[str] = None, **kwargs):
+        await self._respond()
+        self.interaction.messages.append(content)
+
+    async def edit_message(self, **kwargs):
+        await self._respond()
+
+    async def send_modal(self, modal):
+        await self._respond()
+        self.interaction.modal = modal
+
+
+class FakeFollowup:
+    def __init__(self, interaction: 'FakeInteraction'):
+        self.interaction = interaction
+
+    async def send(self, content: Optional[str] = None, **kwargs):
+        await self.interaction.client.api_call()
+        _close_files(kwargs)
+        self.interaction.messages.append(content if content is not None else kwargs.get('embed'))
+        if kwargs.get('view') is not None:
+            self.interaction.view = kwargs['view']
+
+
+class FakeClient:
+    """Just enough of a discord.Client for the cog and its views
+
+    Every Discord API call made through the fakes takes `api_latency` seconds.
+    """
+    def __init__(self, api_latency: float = 0.0):
+        self.api_latency = api_latency
+        self.loop = asyncio.get_event_loop()
+        self.guilds: List[FakeGuild] = []
+        self.users: Dict[int, FakeUser] = {}
+        self.latency = 0.05
+        self.cogs = {}
+
+    async def api_call(self):
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+    def get_user(self, user_id: int):
+        return self.users.get(user_id)
+
+    async def fetch_user(self, user_id: int):
+        return self.users[user_id]
+
+    def get_channel(self, channel_id: int):
+        return None
+
+    async def wait_until_ready(self):
+        pass
+
+    def add_view(self, view, message_id=None):
+        pass
+
+    def add_dynamic_items(self, *items):
+        pass
+
+    def remove_dynamic_items(self, *items):
+        pass
+
+
+class FakeInteraction:
+    """Synthetic interaction, records when the first response happened"""
+    def __init__(self, client: FakeClient, user: FakeUser, guild: Optional[FakeGuild] = None):
+        self.client = client
+        self.user = user
+        self.guild = guild
+        self.channel = None
+        self.command = None
+        self.type = discord.InteractionType.application_command
+        self.created_at = datetime.now(timezone.utc)
+        self.created = time.perf_counter()
+        self.responded_at: Optional[float] = None
+        self.messages: list = []
+        self.modal = None
+        self.view = None
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def edit_original_response(self, **kwargs):
+        await self.client.api_call()
+        _close_files(kwargs)
+        self.messages.append(kwargs['content'] if kwargs.get('content') is not None else kwargs.get('embed'))
+
+    @property
+    def time_to_first_response(self) -> Optional[float]:
+        return self.responded_at - self.created if self.responded_at is not None else None
@@ -0,0 +1,160 @@
+"""Runs the real PatreonCog against the fakes in a scratch directory"""
+import asyncio
+import contextlib
+import os
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.fakes import FakeUpstream, FakeClient, FakeGuild, FakeUser, FakeInteraction
+from utils.metrics import Metrics
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the bot's print logging while a run is measured"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+class Bench:
+    """A started fake upstream plus a loaded cog wired to it"""
+    def __init__(self, upstream: FakeUpstream, api_latency: float = 0.0):
+        self.upstream = upstream
+        self.client = FakeClient(api_latency)
+        self.guild = FakeGuild()
+        self.client.guilds.append(self.guild)
+        self.cog = None
+        self.stats = Metrics(max_samples=100000)
+        self._next_user = 10 ** 17
+        self._workdir = tempfile.TemporaryDirectory(prefix='patreon-bench-')
+        self._cwd = os.getcwd()
+
+    async def start(self):
+        await self.upstream.start()
+
+        # Config, user data and the file cache all live in the scratch directory
+        os.chdir(self._workdir.name)
+        os.environ['STATE_BACKEND'] = 'json'
+        os.environ['PATREON_ACCESS_TOKEN'] = 'bench-token'
+        os.environ['PATREON_CAMPAIGN_ID'] = '1000'
+        os.environ['PATREON_API_BASE'] = f"{self.upstream.base_url}/api/oauth2/v2"
+
+        import cogs.Patreon as patreon
+        patreon.PATREON_API_BASE = os.environ['PATREON_API_BASE']
+
+        with quiet():
+            self.cog = patreon.PatreonCog(self.client)
+            self.client.cogs['PatreonCog'] = self.cog
+
+            # Every file is served by the fake host, under its original name
+            def local(file):
+                return patreon.FileDetails(file.name, f"{self.upstream.base_url}/raw/{file.link.rsplit('/', 1)[-1]}", file.tier)
+            self.cog.files_by_tier = {tier: [local(f) for f in files] for tier, files in self.cog.files_by_tier.items()}
+            self.cog.global_files = [local(f) for f in self.cog.global_files]
+            self.cog.invalidate_catalog()
+
+            await self.cog.cog_load()
+        return self
+
+    async def close(self):
+        with quiet():
+            await self.cog.cog_unload()
+        await self.upstream.stop()
+        os.chdir(self._cwd)
+        self._workdir.cleanup()
+
+    def new_user(self) -> FakeUser:
+        self._next_user += 1
+        user = FakeUser(self.client, self._next_user, self.guild)
+        self.client.users[user.id] = user
+        self.guild.members[user.id] = user
+        return user
+
+    async def new_patrons(self, count: int, tiers: Optional[List[str]] = None) -> List[FakeUser]:
+        """Users already verified with the given tiers (one upstream tier each by default)"""
+        users = [self.new_user() for _ in range(count)]
+        records: Dict[str, dict] = {}
+        for i, user in enumerate(users):
+            records[str(user.id)] = {
+                'discord_id': user.id,
+                'email': self.upstream.email_for(i),
+                'tiers': tiers if tiers is not None else [self.upstream.tier_for(i)],
+                'verified_at': '2026-01-01T00:00:00'
+            }
+        await self.cog.state.put_users(records)
+        return users
+
+    def interaction(self, user: FakeUser) -> FakeInteraction:
+        return FakeInteraction(self.client, user, self.guild)
+
+    async def measure(self, name: str, interaction: FakeInteraction, handler):
+        """Run one handler, recording its total time and time to first response"""
+        started = time.perf_counter()
+        try:
+            await handler
+        except Exception:
+            self.stats.incr(f"{name}.errors")
+            return
+        self.stats.observe(f"{name}.total", time.perf_counter() - started)
+        if interaction.time_to_first_response is not None:
+            self.stats.observe(f"{name}.first_response", interaction.time_to_first_response)
+
+
+class QueueSampler:
+    """Samples the cog's send lanes, DM queue and live views every `interval` seconds"""
+    def __init__(self, cog, interval: float = 0.1):
+        self.cog = cog
+        self.interval = interval
+        self.samples: Dict[str, List[int]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+
+    def sample(self):
+        from utils.sender import LANE_NAMES
+        depths = {f"sender.{name}": self.cog.sender.queue_depth(lane) for lane, name in LANE_NAMES.items()}
+        depths['dm_queue'] = len(self.cog.dm_queue)
+        depths['views.live'] = len(self.cog.views)
+        for name, depth in depths.items():
+            self.samples.setdefault(name, []).append(depth)
+
+    async def _run(self):
+        while True:
+            self.sample()
+            await asyncio.sleep(self.interval)
+
+    def report(self) -> List[str]:
+        return [
+            f"{name:<32} max={max(values):<6} mean={sum(values) / len(values):8.1f}"
+            for name, values in self.samples.items()
+        ]
+
+
+async def run_concurrently(jobs, concurrency: int) -> float:
+    """Await zero-argument coroutine factories with at most `concurrency` in flight, returns elapsed seconds"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(job):
+        async with semaphore:
+            await job()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run(job) for job in jobs))
+    return time.perf_counter() - started
+
+
+def format_row(name: str, stats: Metrics, elapsed: Optional[float] = None) -> str:
+    """One report line: count, p50/p95/p99 in ms and ops/s"""
+    row = stats.percentiles(name)
+    if not row:
+        return f"{name:<32} no samples"
+    line = f"{name:<32} n={row['count']:<6} p50={row['p50'] * 1000:8.1f}ms p95={row['p95'] * 1000:8.1f}ms p99={row['p99'] * 1000:8.1f}ms"
+    if elapsed:
+        line += f" {row['count'] / elapsed:8.1f} ops/s"
+    return line
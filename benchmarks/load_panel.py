@@ -0,0 +1,146 @@
+"""Replays a /setup panel burst against the cog
+
+Users arrive at `--rate` per second (Poisson) and click the persistent
+panel buttons. Unverified users click Verify Email, think for a moment and
+submit the modal; verified users click Download Files and some go on to
+click a file button. Event-loop lag, send queue depths and time to first
+response are reported, with the share of interactions that missed
+Discord's 3 second window.
+
+    python -m benchmarks.load_panel --users 500 --rate 20 --api-latency 80
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from benchmarks.fakes import FakeUpstream
+from benchmarks.harness import Bench, QueueSampler, quiet, format_row
+from utils.interactions import RESPONSE_WINDOW
+from utils.metrics import metrics
+
+
+STEPS = ('panel_verify', 'modal_submit', 'panel_files', 'file_button')
+
+
+async def click(bench: Bench, step: str, user, callback):
+    """One interaction arriving now, returns it once the handler finished"""
+    interaction = bench.interaction(user)
+    await bench.measure(step, interaction, callback(interaction))
+    ttfr = interaction.time_to_first_response
+    if ttfr is None or ttfr > RESPONSE_WINDOW:
+        bench.stats.incr(f"{step}.missed_window")
+    return interaction
+
+
+async def verify_flow(bench: Bench, user, email: str, think_time: float):
+    panel = bench.cog.persistent_view
+    interaction = await click(bench, 'panel_verify', user, panel.verify_button.callback)
+    modal = interaction.modal
+    if modal is None:
+        return
+
+    await asyncio.sleep(random.expovariate(1 / think_time) if think_time else 0)
+    modal.email._value = email
+    await click(bench, 'modal_submit', user, modal.on_submit)
+
+
+async def files_flow(bench: Bench, user, download_ratio: float):
+    import cogs.Patreon as patreon
+    panel = bench.cog.persistent_view
+    interaction = await click(bench, 'panel_files', user, panel.files_button.callback)
+    view = interaction.view
+    if view is None or random.random() >= download_ratio:
+        return
+
+    buttons = [item for item in view.children if isinstance(item, patreon.FileDownloadButton)]
+    if buttons:
+        await asyncio.sleep(random.uniform(0.5, 2.0))
+        await click(bench, 'file_button', user, random.choice(buttons).callback)
+
+
+async def run_burst(bench: Bench, args) -> float:
+    upstream = bench.upstream
+    verified_count = int(args.users * args.verified)
+    patrons = await bench.new_patrons(verified_count)
+    newcomers = [bench.new_user() for _ in range(args.users - verified_count)]
+
+    flows = [files_flow(bench, user, args.download_ratio) for user in patrons]
+    flows += [
+        verify_flow(bench, user, upstream.email_for(i % upstream.member_count), args.think_time)
+        for i, user in enumerate(newcomers)
+    ]
+    random.shuffle(flows)
+
+    # Start each flow at its Poisson arrival time
+    tasks = []
+    started = time.perf_counter()
+    for flow in flows:
+        tasks.append(asyncio.create_task(flow))
+        await asyncio.sleep(random.expovariate(args.rate))
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - started
+
+
+async def main(args) -> int:
+    random.seed(args.seed)
+    upstream = FakeUpstream(
+        tiers=args.tiers,
+        member_count=args.members,
+        page_latency=args.page_latency / 1000,
+        file_size=args.file_size * 1024,
+        file_latency=args.file_latency / 1000
+    )
+    bench = await Bench(upstream, api_latency=args.api_latency / 1000).start()
+    sampler = QueueSampler(bench.cog)
+
+    try:
+        print(f"users={args.users} rate={args.rate}/s verified={args.verified:.0%} members={args.members} api_latency={args.api_latency}ms")
+        # Loop lag comes from the cog's own monitor, counted from the start of the burst
+        metrics.timings.pop("loop.lag", None)
+        metrics.counters.pop("loop.stalls", None)
+        sampler.start()
+        with quiet():
+            elapsed = await run_burst(bench, args)
+        sampler.stop()
+
+        print(f"burst finished in {elapsed:.1f}s")
+        for step in STEPS:
+            print(format_row(f"{step}.first_response", bench.stats))
+            print(format_row(f"{step}.total", bench.stats))
+            missed = bench.stats.counters.get(f"{step}.missed_window", 0)
+            errors = bench.stats.counters.get(f"{step}.errors", 0)
+            if missed or errors:
+                print(f"{step:<32} missed_window={missed} errors={errors}")
+        print(format_row("loop.lag", metrics))
+        print(f"{'loop.lag max':<32} {max(metrics.timings['loop.lag'], default=0) * 1000:.1f}ms")
+        print(f"{'loop.stalls':<32} {metrics.counters.get('loop.stalls', 0)} over {bench.cog.loop_monitor.threshold * 1000:.0f}ms")
+        for line in sampler.report():
+            print(line)
+        print(f"upstream requests: {upstream.requests}")
+    finally:
+        sampler.stop()
+        await bench.close()
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=300, help="users in the burst")
+    parser.add_argument('--rate', type=float, default=10, help="arrivals per second")
+    parser.add_argument('--verified', type=float, default=0.6, help="share of users already verified")
+    parser.add_argument('--download-ratio', type=float, default=0.5, help="share of file menus followed by a download")
+    parser.add_argument('--think-time', type=float, default=5, help="mean seconds to type an email")
+    parser.add_argument('--api-latency', type=float, default=50, help="ms per Discord API call")
+    parser.add_argument('--members', type=int, default=1000, help="patrons in the fake campaign")
+    parser.add_argument('--page-latency', type=float, default=50, help="ms per member page")
+    parser.add_argument('--file-size', type=int, default=256, help="KB per file")
+    parser.add_argument('--file-latency', type=float, default=20, help="ms per file download")
+    parser.add_argument('--tiers', nargs='+', default=['Gladiator Priest', 'Advanced Mage', 'AIO PvE and PvP'])
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main(parse_args())))
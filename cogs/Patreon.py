@@ -1,13 +1,63 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import aiohttp
 import os
 from typing import List, Optional
-import json
 from datetime import datetime, timedelta
 import asyncio
 import time
+import csv
+import io
+import re
+import hashlib
+import zlib
+from utils.expiry import ExpiryScheduler, BAN, ACCESS
+from utils.metrics import metrics
+from utils.ratelimit import TokenBucket, InFlightGuard, rate_limited
+from utils.sender import SendScheduler, INTERACTION, DM, LOG
+from utils.filecache import FileCache, CachedFile, FileTooLarge
+from utils.attachments import AttachmentStore, url_expires_at
+from utils.state import create_backend
+from utils.records import UserRecord, tier_catalog
+from utils.storage import storage
+from utils.notify import DMQueue
+from utils.roles import RoleSync
+from utils.search import FileIndex
+from utils.interactions import acknowledge, deferred, Progress
+from utils.render import RenderCache
+from utils.views import ViewRegistry
+from utils.loopmon import LoopMonitor
+from utils.profiler import SamplingProfiler
+from utils.codec import codec
+from utils.patreon import CampaignTiers, fetch_campaign, member_params, member_tier_ids
+
+# Download rate limits: bursts of 5 files, refilling one every 4 seconds
+DOWNLOAD_BUCKET = TokenBucket(rate=0.25, capacity=5, name="download")
+BULK_DOWNLOAD_GUARD = InFlightGuard()
+
+# Uploads are allowed up to 25MB, or more in boosted guilds. DMs always get 25MB
+DEFAULT_UPLOAD_LIMIT = 25 * 1024 * 1024
+
+# Bulk admin commands accept at most this many users / this big a CSV
+BULK_MAX_TARGETS = 5000
+BULK_MAX_CSV_SIZE = 1024 * 1024
+USER_ID_PATTERN = re.compile(r"\d{15,20}")
+
+# File menus show 3 rows of 4 buttons per page
+FILES_PER_PAGE = 12
+
+# Reply to clicks on a file menu built from an older file catalog
+STALE_MENU_MESSAGE = "❌ **This menu is out of date**: Use `/files` again."
+
+# Overridable so benchmarks can point the bot at a fake Patreon API
+PATREON_API_BASE = os.getenv('PATREON_API_BASE', 'https://www.patreon.com/api/oauth2/v2')
+
+# Campaign id and tier catalog are kept in the state backend and refetched after this long
+CAMPAIGN_TTL = int(os.getenv('PATREON_CAMPAIGN_TTL', str(24 * 3600)))
+
+# Bot settings kept in the state backend's 'config' namespace
+CONFIG_KEYS = ('log_channel_id', 'storage_channel_id')
 
 class FileDetails:
     """Represents a downloadable file"""
@@ -15,6 +65,8 @@ class FileDetails:
         self.name = name
         self.link = link
         self.tier = tier
+        # Short stable id, used in button custom_ids
+        self.id = hashlib.sha1(link.encode()).hexdigest()[:8]
         self.version_link = self._create_version_link(link)
         self.last_uploaded = "Unknown"
         self.last_installed = "Unknown"
@@ -44,12 +96,12 @@ class PersistentSetupView(discord.ui.View):
         """Show email verification modal"""
         modal = EmailModal(self.cog)
         await interaction.response.send_modal(modal)
+        self.cog.views.track(interaction.user.id, 'verify_modal', modal)
     
     @discord.ui.button(label="📂 Download Files", style=discord.ButtonStyle.primary, custom_id="persistent_files")
+    @deferred()
     async def files_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Show files if user is verified"""
-        await interaction.response.defer(ephemeral=True)
-        
         # Check ban status
         ban_msg = self.cog.check_ban_status(interaction.user.id)
         if ban_msg:
@@ -60,33 +112,19 @@ class PersistentSetupView(discord.ui.View):
         temp_access, temp_expiry = self.cog.check_temp_access(interaction.user.id)
         
         if temp_access:
+            mask = None
             files = self.cog.get_all_files()
             embed_footer = f"✅ Temporary Access (Expires <t:{int(temp_expiry.timestamp())}:R>)"
         else:
-            if not os.path.exists(self.cog.user_data_file):
-                await interaction.followup.send(
-                    "❌ **Not Verified**: Please verify your email first by clicking the **Verify Email** button!",
-                    ephemeral=True
-                )
-                return
-            
-            try:
-                with open(self.cog.user_data_file, 'r') as f:
-                    all_data = json.load(f)
-            except:
-                await interaction.followup.send("❌ **Error reading data**", ephemeral=True)
-                return
-            
-            user_data = all_data.get(str(interaction.user.id))
-            if not user_data:
+            mask = await self.cog.resolve_tier_mask(interaction.user)
+            if mask is None:
                 await interaction.followup.send(
                     "❌ **Not Verified**: Please verify your email first by clicking the **Verify Email** button!",
                     ephemeral=True
                 )
                 return
             
-            tiers = user_data.get('tiers', [])
-            files = self.cog.get_files_for_tiers(tiers)
+            files = self.cog.get_files_for_mask(mask)
             embed_footer = "Files will be sent to your DMs • Click buttons below to download"
         
         if not files:
@@ -94,28 +132,8 @@ class PersistentSetupView(discord.ui.View):
             return
         
         # Show files view with download buttons
-        view = FilesView(self.cog, files, interaction.user)
-        
-        embed = discord.Embed(
-            title="📂 Your Available Files",
-            description=f"You have access to **{len(files)}** files\n\nSelect download option below:",
-            color=discord.Color.blue()
-        )
-        
-        # Group files by tier
-        files_by_tier = {}
-        for file in files:
-            if file.tier not in files_by_tier:
-                files_by_tier[file.tier] = []
-            files_by_tier[file.tier].append(file.name)
-        
-        for tier, file_names in list(files_by_tier.items())[:5]:
-            file_list = "\n".join([f"• {name}" for name in file_names[:10]])
-            if len(file_names) > 10:
-                file_list += f"\n... and {len(file_names) - 10} more"
-            embed.add_field(name=f"📁 {tier}", value=file_list, inline=False)
-        
-        embed.set_footer(text=embed_footer)
+        view = FilesView(self.cog, files, mask)
+        embed = self.cog.get_files_embed('panel', mask, files, embed_footer)
         
         await interaction.followup.send(embed=embed, view=view, ephemeral=True)
 
@@ -131,12 +149,12 @@ class SetupView(discord.ui.View):
         """Show email verification modal"""
         modal = EmailModal(self.cog)
         await interaction.response.send_modal(modal)
+        self.cog.views.track(interaction.user.id, 'verify_modal', modal)
     
     @discord.ui.button(label="📂 Show Files", style=discord.ButtonStyle.primary)
+    @deferred()
     async def files_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Show files if user is verified"""
-        await interaction.response.defer(ephemeral=True)
-        
         # Check ban status
         ban_msg = self.cog.check_ban_status(interaction.user.id)
         if ban_msg:
@@ -147,33 +165,19 @@ class SetupView(discord.ui.View):
         temp_access, temp_expiry = self.cog.check_temp_access(interaction.user.id)
         
         if temp_access:
+            mask = None
             files = self.cog.get_all_files()
             embed_footer = f"✅ Temporary Access (Expires <t:{int(temp_expiry.timestamp())}:R>)"
         else:
-            if not os.path.exists(self.cog.user_data_file):
-                await interaction.followup.send(
-                    "❌ **Not Verified**: Please verify your email first!",
-                    ephemeral=True
-                )
-                return
-            
-            try:
-                with open(self.cog.user_data_file, 'r') as f:
-                    all_data = json.load(f)
-            except:
-                await interaction.followup.send("❌ **Error reading data**", ephemeral=True)
-                return
-            
-            user_data = all_data.get(str(interaction.user.id))
-            if not user_data:
+            mask = await self.cog.resolve_tier_mask(interaction.user)
+            if mask is None:
                 await interaction.followup.send(
                     "❌ **Not Verified**: Please verify your email first!",
                     ephemeral=True
                 )
                 return
             
-            tiers = user_data.get('tiers', [])
-            files = self.cog.get_files_for_tiers(tiers)
+            files = self.cog.get_files_for_mask(mask)
             embed_footer = "Files will be sent to your DMs"
         
         if not files:
@@ -181,26 +185,8 @@ class SetupView(discord.ui.View):
             return
         
         # Show files view with download buttons
-        view = FilesView(self.cog, files, interaction.user)
-        
-        embed = discord.Embed(
-            title="📂 Your Available Files",
-            description=f"You have access to **{len(files)}** files\n\nSelect files to download below:",
-            color=discord.Color.blue()
-        )
-        
-        # Group files by tier
-        files_by_tier = {}
-        for file in files:
-            if file.tier not in files_by_tier:
-                files_by_tier[file.tier] = []
-            files_by_tier[file.tier].append(file.name)
-        
-        for tier, file_names in list(files_by_tier.items())[:5]:  # Show first 5 tiers
-            file_list = "\n".join([f"• {name}" for name in file_names])
-            embed.add_field(name=f"📁 {tier}", value=file_list, inline=False)
-        
-        embed.set_footer(text=embed_footer)
+        view = FilesView(self.cog, files, mask)
+        embed = self.cog.get_files_embed('setup', mask, files, embed_footer)
         
         await interaction.followup.send(embed=embed, view=view, ephemeral=True)
 
@@ -215,248 +201,225 @@ class EmailModal(discord.ui.Modal, title="Verify Patreon Email"):
     )
     
     def __init__(self, cog):
-        super().__init__()
+        # Dismissed modals would otherwise stay in the view store forever
+        super().__init__(timeout=600)
         self.cog = cog
     
+    # Thinking gives the submit its own ephemeral response, a plain defer
+    # would make edits land on the panel message the modal came from
+    @deferred(thinking=True)
     async def on_submit(self, interaction: discord.Interaction):
         """Handle email submission"""
-        await interaction.response.defer(ephemeral=True)
-        
         email = self.email.value.strip()
         
-        try:
-            tiers, error = await asyncio.wait_for(
-                self.cog.get_patreon_tiers(email),
-                timeout=25.0
-            )
-            
-            if error:
-                await interaction.followup.send(error, ephemeral=True)
-                return
-            
-            if not tiers:
-                await interaction.followup.send("❌ **No tiers found**", ephemeral=True)
-                return
-            
-            # Save user data
-            user_data = {
-                'discord_id': interaction.user.id,
-                'email': email,
-                'tiers': tiers,
-                'verified_at': datetime.now().isoformat()
-            }
-            
-            
-            all_data = {}
-            if os.path.exists(self.cog.user_data_file):
-                try:
-                    with open(self.cog.user_data_file, 'r') as f:
-                        all_data = json.load(f)
-                except:
-                    pass
-            
-            # Preserve ban_expiry if exists
-            existing_user = all_data.get(str(interaction.user.id))
-            if existing_user and 'ban_expiry' in existing_user:
-                user_data['ban_expiry'] = existing_user['ban_expiry']
-            
-            all_data[str(interaction.user.id)] = user_data
-            
-            with open(self.cog.user_data_file, 'w') as f:
-                json.dump(all_data, f, indent=2)
-            
-            tier_list = "\n".join([f"• {tier}" for tier in sorted(set(tiers))])
-            
-            embed = discord.Embed(
-                title="✅ Verification Successful!",
-                description=f"Welcome, {interaction.user.mention}!",
-                color=discord.Color.green()
-            )
-            embed.add_field(name="Your Patreon Tiers", value=tier_list, inline=False)
-            embed.add_field(
-                name="Next Steps",
-                value="Click the **Show Files** or **Download Files** button to view your downloads!",
-                inline=False
-            )
-            
-            await interaction.followup.send(embed=embed, ephemeral=True)
-            
-            # Log verification
-            await self.cog.log_action(
-                f"**User Verified**\n"
-                f"User: {interaction.user.mention}\n"
-                f"Email: {email}\n"
-                f"Tiers: {', '.join(tiers[:3])}{'...' if len(tiers) > 3 else ''}",
-                interaction.user,
-                discord.Color.green()
-            )
-            
-        except asyncio.TimeoutError:
-            await interaction.followup.send("❌ **Timeout**: Please try again.", ephemeral=True)
-        except Exception as e:
-            await interaction.followup.send(f"❌ **Error**: {str(e)}", ephemeral=True)
+        tiers = await self.cog.verify_email(
+            interaction, email,
+            "Click the **Show Files** or **Download Files** button to view your downloads!"
+        )
+        if tiers is None:
+            return
+        
+        # Log verification
+        await self.cog.log_action(
+            f"**User Verified**\n"
+            f"User: {interaction.user.mention}\n"
+            f"Email: {email}\n"
+            f"Tiers: {', '.join(tiers[:3])}{'...' if len(tiers) > 3 else ''}",
+            interaction.user,
+            discord.Color.green()
+        )
 
 
 class FilesView(discord.ui.View):
-    """View with file download buttons and pagination"""
-    def __init__(self, cog, files, user):
-        super().__init__(timeout=600)
-        self.cog = cog
-        self.files = files
-        self.user = user
-        self.current_page = 0
-        self.batch_size = 12  # 3 rows of 4 buttons
-        
-        # Initial view setup
-        self.update_view()
+    """Stateless page of file download buttons
 
-    def update_view(self):
-        """Update buttons based on current page"""
-        self.clear_items()
+    Every button is a DynamicItem whose custom_id carries the page, file id
+    and catalog version. Clicks are routed by the handlers registered in
+    cog_load, so no per-user view is kept and menus survive restarts. Clicks
+    on a menu from another catalog version are answered with STALE_MENU_MESSAGE.
+    The view itself must never be dispatchable, see is_dispatchable.
+    """
+    def __init__(self, cog, files, mask=None, page=0):
+        super().__init__(timeout=None)
+        self.files = files
+        self.batch_size = FILES_PER_PAGE
+        total_pages = (len(files) - 1) // self.batch_size + 1
+        self.page = page = max(0, min(page, total_pages - 1))
+        version = cog.catalog_version
         
         # Always add 'Download All' button at the top (Row 0)
-        self.add_item(DownloadAllButton(self.cog, self.files, self.user))
+        self.add_item(DownloadAllButton(len(files), version))
         
-        # Calculate pagination
-        start_idx = self.current_page * self.batch_size
-        end_idx = start_idx + self.batch_size
-        current_batch = self.files[start_idx:end_idx]
+        # Page layout is the same for everyone with this entitlement
+        key = ('files_page', cog.entitlement_key(mask), page)
+        layout = cog.render_cache.get(key, self._page_layout)
         
         # Add file buttons for current page
         # They will take up Rows 1, 2, 3
-        for idx, file in enumerate(current_batch):
-            # Calculate row: idx // 4 gives 0,1,2. We want rows 1,2,3.
-            row = (idx // 4) + 1
-            button_idx = start_idx + idx
-            self.add_item(FileDownloadButton(self.cog, file, self.user, button_idx, row=row))
+        for file, row in layout:
+            self.add_item(FileDownloadButton(file, page, version, row=row))
 
-        # Add Navigation Buttons on Row 4
-        if self.current_page > 0:
-            self.add_item(self.prev_button)
-            
-        # Add Page Indicator
-        total_pages = (len(self.files) - 1) // self.batch_size + 1
-        indicator = discord.ui.Button(
-            label=f"Page {self.current_page + 1}/{total_pages}",
-            style=discord.ButtonStyle.secondary,
-            disabled=True,
-            row=4
-        )
-        self.add_item(indicator)
+        # Add Navigation Buttons and Page Indicator on Row 4
+        if page > 0:
+            self.add_item(PageButton(page - 1, version, "◀️ Previous"))
+        self.add_item(PageButton(page, version, f"Page {page + 1}/{total_pages}", disabled=True))
+        if (page + 1) * self.batch_size < len(files):
+            self.add_item(PageButton(page + 1, version, "Next ▶️"))
+
+    def is_dispatchable(self) -> bool:
+        # Clicks are routed by the dynamic items registered in cog_load. Kept
+        # out of the view store, so no copy lives on until a timeout, and a
+        # timeout can't unregister those dynamic items with it
+        return False
 
-        if end_idx < len(self.files):
-            self.add_item(self.next_button)
+    def _page_layout(self) -> tuple:
+        """(file, row) of each button on the current page"""
+        start_idx = self.page * self.batch_size
+        current_batch = self.files[start_idx:start_idx + self.batch_size]
+        # Calculate row: idx // 4 gives 0,1,2. We want rows 1,2,3.
+        return tuple((file, (idx // 4) + 1) for idx, file in enumerate(current_batch))
 
-    @property
-    def prev_button(self):
-        button = discord.ui.Button(label="◀️ Previous", style=discord.ButtonStyle.primary, row=4)
-        async def callback(interaction: discord.Interaction):
-            self.current_page -= 1
-            self.update_view()
-            await interaction.response.edit_message(view=self)
-        button.callback = callback
-        return button
 
-    @property
-    def next_button(self):
-        button = discord.ui.Button(label="Next ▶️", style=discord.ButtonStyle.primary, row=4)
-        async def callback(interaction: discord.Interaction):
-            self.current_page += 1
-            self.update_view()
-            await interaction.response.edit_message(view=self)
-        button.callback = callback
-        return button
-    
-    async def on_timeout(self):
-        """Disable buttons on timeout"""
-        for item in self.children:
-            item.disabled = True
+def _get_cog(interaction: discord.Interaction) -> 'PatreonCog':
+    return interaction.client.get_cog('PatreonCog')
 
 
-class DownloadAllButton(discord.ui.Button):
+class PageButton(discord.ui.DynamicItem[discord.ui.Button], template=r'files:page:(?P<version>\d+):(?P<page>\d+)'):
+    """Previous / next page button, re-renders the menu for the clicking user"""
+    def __init__(self, page: int, version: int, label: str = "", disabled: bool = False):
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=discord.ButtonStyle.secondary if disabled else discord.ButtonStyle.primary,
+            custom_id=f"files:page:{version}:{page}",
+            disabled=disabled,
+            row=4
+        ))
+        self.page = page
+        self.version = version
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match):
+        return cls(int(match['page']), int(match['version']))
+    
+    async def callback(self, interaction: discord.Interaction):
+        """Show another page, built from the user's current entitlement"""
+        cog = _get_cog(interaction)
+        # Page numbers of a menu from an older catalog point at other files now
+        if self.version != cog.catalog_version:
+            metrics.incr("files.stale_menu")
+            await interaction.response.send_message(STALE_MENU_MESSAGE, ephemeral=True)
+            return
+        
+        mask, files = await cog.get_entitled_files(interaction.user)
+        if not files:
+            await interaction.response.send_message("❌ **No files available**", ephemeral=True)
+            return
+        
+        view = FilesView(cog, files, mask, self.page)
+        await interaction.response.edit_message(view=view)
+
+
+class DownloadAllButton(discord.ui.DynamicItem[discord.ui.Button], template=r'files:all:(?P<version>\d+)'):
     """Button to download all files"""
-    def __init__(self, cog, files, user):
-        super().__init__(
-            label=f"📥 Download All ({len(files)} files)",
+    def __init__(self, count: int, version: int):
+        super().__init__(discord.ui.Button(
+            label=f"📥 Download All ({count} files)",
             style=discord.ButtonStyle.success,
+            custom_id=f"files:all:{version}",
             row=0
-        )
-        self.cog = cog
-        self.files = files
-        self.user = user
+        ))
+        self.version = version
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match):
+        return cls(0, int(match['version']))
     
+    @rate_limited(DOWNLOAD_BUCKET, "download_all", cost=5, guard=BULK_DOWNLOAD_GUARD)
+    @deferred()
     async def callback(self, interaction: discord.Interaction):
         """Download all files to DM"""
-        await interaction.response.defer(ephemeral=True)
+        cog = _get_cog(interaction)
+        user = interaction.user
         
         # Check ban status
-        ban_msg = self.cog.check_ban_status(interaction.user.id)
+        ban_msg = cog.check_ban_status(user.id)
         if ban_msg:
             await interaction.followup.send(ban_msg, ephemeral=True)
             return
         
+        # The file count on the button is from the catalog the menu was built with
+        if self.version != cog.catalog_version:
+            metrics.incr("files.stale_menu")
+            await interaction.followup.send(STALE_MENU_MESSAGE, ephemeral=True)
+            return
+        
+        # Entitlement is checked on every click, the menu itself holds no state
+        _, files = await cog.get_entitled_files(user)
+        if not files:
+            await interaction.followup.send("❌ **No files available**", ephemeral=True)
+            return
+        
         try:
             # Try to send a DM
-            dm_channel = await self.user.create_dm()
+            dm_channel = await user.create_dm()
             
-            await interaction.followup.send(
-                f"📤 Sending {len(self.files)} files to your DMs...",
+            await cog.sender.submit(
+                INTERACTION, interaction.followup.send,
+                f"📤 Sending {len(files)} files to your DMs...",
                 ephemeral=True
             )
             
             # Send files in batches of 5 (Discord limit is 10 attachments per message)
             batch_size = 5
-            for i in range(0, len(self.files), batch_size):
-                batch = self.files[i:i + batch_size]
+            batch_count = (len(files) + batch_size - 1) // batch_size
+            # DM uploads are capped at the default, bigger files can only be linked
+            limit = cog.get_delivery_limit(DEFAULT_UPLOAD_LIMIT)
+            progress = Progress(interaction, cog.sender)
+            for i in range(0, len(files), batch_size):
+                batch = files[i:i + batch_size]
+                await progress.update(f"📤 Sending batch {i//batch_size + 1}/{batch_count} to your DMs...")
                 
                 attachments = []
                 batch_info = []
+                linked = 0
                 
+                # One DM per batch: stored copies are linked, the rest attached
                 for file in batch:
-                    content = await self.cog.download_file(file.link)
-                    if content:
-                        filename = file.link.split('/')[-1]
-                        file_size = len(content) / (1024 * 1024)
-                        
-                        # Skip files over 25MB
-                        if file_size <= 25:
-                            discord_file = discord.File(
-                                fp=__import__('io').BytesIO(content),
-                                filename=filename
-                            )
-                            attachments.append(discord_file)
-                            batch_info.append(f"✅ {file.name} ({file_size:.2f}MB)")
+                    # Oversize files are skipped before downloading
+                    cached, oversize = await cog.download_file(file.link, limit)
+                    if cached:
+                        url = await cog.get_attachment_url(cached)
+                        if url:
+                            linked += 1
+                            batch_info.append(f"✅ [{file.name}]({url}) ({cached.size_mb:.2f}MB)")
+                        elif cached.size <= DEFAULT_UPLOAD_LIMIT:
+                            attachments.append(cached.to_discord_file())
+                            batch_info.append(f"✅ {file.name} ({cached.size_mb:.2f}MB)")
                         else:
-                            batch_info.append(f"⚠️ {file.name} ({file_size:.2f}MB - Too large, download from: {file.link})")
+                            oversize = cached.size
+                    if oversize:
+                        batch_info.append(f"⚠️ {file.name} ({oversize / (1024 * 1024):.2f}MB - Too large, download from: {file.link})")
                 
-                if attachments:
-                    embed = discord.Embed(
-                        title=f"📦 Files Batch {i//batch_size + 1}",
-                        description="\n".join(batch_info),
-                        color=discord.Color.green()
-                    )
-                    await dm_channel.send(embed=embed, files=attachments)
-                else:
-                    embed = discord.Embed(
-                        title=f"📦 Files Batch {i//batch_size + 1}",
-                        description="\n".join(batch_info),
-                        color=discord.Color.orange()
-                    )
-                    await dm_channel.send(embed=embed)
+                embed = discord.Embed(
+                    title=f"📦 Files Batch {i//batch_size + 1}",
+                    description="\n".join(batch_info),
+                    color=discord.Color.green() if attachments or linked else discord.Color.orange()
+                )
+                if linked:
+                    embed.set_footer(text="Links expire after a day, use Download All again for fresh ones")
+                await cog.sender.submit(DM, dm_channel.send, embed=embed, files=attachments, route=f"dm:{user.id}")
                 
                 # Small delay between batches
                 await asyncio.sleep(2)
             
-            await interaction.edit_original_response(
-                content=f"✅ **All files sent to your DMs!** Check your direct messages."
-            )
+            await progress.finish(f"✅ **All files sent to your DMs!** Check your direct messages.")
             
             # Log download
-            await self.cog.log_action(
+            await cog.log_action(
                 f"**Bulk Download**\n"
-                f"User: {self.user.mention}\n"
-                f"Files: {len(self.files)} files downloaded",
-                self.user,
+                f"User: {user.mention}\n"
+                f"Files: {len(files)} files downloaded",
+                user,
                 discord.Color.blue()
             )
             
@@ -472,84 +435,114 @@ class DownloadAllButton(discord.ui.Button):
             )
 
 
-class FileDownloadButton(discord.ui.Button):
+class FileDownloadButton(discord.ui.DynamicItem[discord.ui.Button],
+                         template=r'files:file:(?P<version>\d+):(?P<page>\d+):(?P<file_id>[0-9a-f]+)'):
     """Button for individual file download"""
-    def __init__(self, cog, file, user, idx, row=None):
+    def __init__(self, file, page: int, version: int, row: int = 1, file_id: Optional[str] = None):
         # Truncate label if too long
-        label = file.name[:75] if len(file.name) > 75 else file.name
+        label = (file.name[:75] if len(file.name) > 75 else file.name) if file else "Unknown"
+        file_id = file.id if file else file_id
         
-        # Default row calculation if not provided (fallback)
-        if row is None:
-            row = (idx // 4) + 1
-
-        super().__init__(
+        super().__init__(discord.ui.Button(
             label=label,
             style=discord.ButtonStyle.secondary,
-            custom_id=f"file_{idx}",
+            custom_id=f"files:file:{version}:{page}:{file_id}",
             row=row
-        )
-        self.cog = cog
+        ))
         self.file = file
-        self.user = user
+        self.version = version
+    
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match: re.Match):
+        file = _get_cog(interaction).files_by_id.get(match['file_id'])
+        return cls(file, int(match['page']), int(match['version']), file_id=match['file_id'])
     
+    @rate_limited(DOWNLOAD_BUCKET, "download_file")
+    @deferred()
     async def callback(self, interaction: discord.Interaction):
         """Download single file to DM"""
-        await interaction.response.defer(ephemeral=True)
+        cog = _get_cog(interaction)
+        user = interaction.user
+        target_file = self.file
         
         # Check ban status
-        ban_msg = self.cog.check_ban_status(interaction.user.id)
+        ban_msg = cog.check_ban_status(user.id)
         if ban_msg:
             await interaction.followup.send(ban_msg, ephemeral=True)
             return
         
+        # The file may have been changed or removed since the menu was sent
+        if target_file is None or self.version != cog.catalog_version:
+            metrics.incr("files.stale_menu")
+            await interaction.followup.send(STALE_MENU_MESSAGE, ephemeral=True)
+            return
+        
+        _, files = await cog.get_entitled_files(user)
+        if not files or target_file not in files:
+            await interaction.followup.send("❌ **You don't have access to this file**", ephemeral=True)
+            return
+        
         try:
-            dm_channel = await self.user.create_dm()
+            dm_channel = await user.create_dm()
             
-            await interaction.followup.send(
-                f"📤 Sending **{self.file.name}** to your DMs...",
+            await cog.sender.submit(
+                INTERACTION, interaction.followup.send,
+                f"📤 Sending **{target_file.name}** to your DMs...",
                 ephemeral=True
             )
             
-            content = await self.cog.download_file(self.file.link)
+            # DM uploads are capped at the default, bigger files can only be linked
+            limit = cog.get_delivery_limit(DEFAULT_UPLOAD_LIMIT)
+            cached, oversize = await cog.download_file(target_file.link, limit)
             
-            if not content:
-                await interaction.edit_original_response(
-                    content=f"❌ **Download failed for {self.file.name}**"
+            if not cached and not oversize:
+                await cog.sender.submit(
+                    INTERACTION, interaction.edit_original_response,
+                    content=f"❌ **Download failed for {target_file.name}**"
                 )
                 return
             
-            filename = self.file.link.split('/')[-1]
-            file_size = len(content) / (1024 * 1024)
-            
-            if file_size > 25:
-                await dm_channel.send(
-                    f"⚠️ **{self.file.name}** is too large ({file_size:.2f}MB)\n"
-                    f"Download directly from: {self.file.link}"
+            if oversize:
+                await cog.sender.submit(
+                    DM, dm_channel.send,
+                    f"⚠️ **{target_file.name}** is too large ({oversize / (1024 * 1024):.2f}MB)\n"
+                    f"Download directly from: {target_file.link}",
+                    route=f"dm:{user.id}"
                 )
             else:
-                discord_file = discord.File(
-                    fp=__import__('io').BytesIO(content),
-                    filename=filename
-                )
-                
                 embed = discord.Embed(
-                    title=f"📥 {self.file.name}",
-                    description=f"**Size**: {file_size:.2f}MB\n**Tier**: {self.file.tier}",
+                    title=f"📥 {target_file.name}",
+                    description=f"**Size**: {cached.size_mb:.2f}MB\n**Tier**: {target_file.tier}",
                     color=discord.Color.green()
                 )
                 
-                await dm_channel.send(embed=embed, file=discord_file)
+                # The stored copy is linked in the same message instead of uploaded again
+                url = await cog.get_attachment_url(cached)
+                if url:
+                    embed.description += f"\n[Download {cached.filename}]({url})"
+                    await cog.sender.submit(DM, dm_channel.send, embed=embed, route=f"dm:{user.id}")
+                elif cached.size > DEFAULT_UPLOAD_LIMIT:
+                    await cog.sender.submit(
+                        DM, dm_channel.send,
+                        f"⚠️ **{target_file.name}** is too large ({cached.size_mb:.2f}MB)\n"
+                        f"Download directly from: {target_file.link}",
+                        route=f"dm:{user.id}"
+                    )
+                else:
+                    discord_file = cached.to_discord_file()
+                    await cog.sender.submit(DM, dm_channel.send, embed=embed, file=discord_file, route=f"dm:{user.id}")
             
-            await interaction.edit_original_response(
-                content=f"✅ **{self.file.name}** sent to your DMs!"
+            await cog.sender.submit(
+                INTERACTION, interaction.edit_original_response,
+                content=f"✅ **{target_file.name}** sent to your DMs!"
             )
             
             # Log download
-            await self.cog.log_action(
+            await cog.log_action(
                 f"**File Downloaded**\n"
-                f"User: {self.user.mention}\n"
-                f"File: {self.file.name}",
-                self.user,
+                f"User: {user.mention}\n"
+                f"File: {target_file.name}",
+                user,
                 discord.Color.blue()
             )
             
@@ -570,15 +563,38 @@ class PatreonCog(commands.Cog):
         self.bot = bot
         self.patreon_access_token = os.getenv('PATREON_ACCESS_TOKEN')
         self.patreon_campaign_id = os.getenv('PATREON_CAMPAIGN_ID')
-        self.user_data_file = 'user_data.json'
+        # Legacy config file, only read to migrate it into the state backend
         self.config_file = 'bot_config.json'
-        self._campaign_id_fetched = False
+        self.campaign_name = None
+        self.campaign_tiers = CampaignTiers()
+        self._campaign_lock = asyncio.Lock()
+        self._background_tasks = set()
         self.log_channel_id = None
+        self.storage_channel_id = None
         
-        # Load config
-        self._load_config()
+        # User records, shared caches and rate limits live in the state backend
+        self.state = create_backend()
+        DOWNLOAD_BUCKET.backend = self.state
+        print(f"State backend: {type(self.state).__name__}")
+        
+        # All outbound uploads / DMs / logs share one prioritised send queue
+        self.sender = SendScheduler()
+        
+        # Notifications from bulk commands are paced in the background
+        self.dm_queue = DMQueue(bot, self.sender, rate=float(os.getenv('BULK_DM_RATE', '1')))
+        
+        # Downloaded files are cached on disk and uploaded straight from the file
+        self.file_cache = FileCache('file_cache')
+        
+        # Each file version is uploaded once to the storage channel and linked after
+        self.attachment_store = AttachmentStore(self.state)
+        # digest -> [lock, users], dropped once the last user releases it
+        self._storage_locks = {}
         
         print("Initializing PatreonCog...")
+
+        # Temp bans / temp access are tracked in memory and expired on time
+        self.expiry_scheduler = ExpiryScheduler(self._on_expiry)
         
         # Initialize file configurations
         self.files_by_tier = {
@@ -632,98 +648,174 @@ class PatreonCog(commands.Cog):
             FileDetails("Classic Globals", "https://gitfront.io/r/Spiken/PsBQrHcwPBdM/CataGlobals/raw/Classicglobals.lua", "None")
         ]
         
+        # File tiers take the low bits of the tier mask, in catalog order
+        self._file_tier_mask = tier_catalog.mask_for(list(self.files_by_tier))
+        self._files_by_mask = {}
+        self._file_indexes = {}
+        
+        # Per-user views / modals kept alive by discord.py are capped
+        self.views = ViewRegistry(max_live=int(os.getenv('MAX_LIVE_VIEWS', '1000')))
+        
+        # Embeds and view layouts are built once per entitlement and reused
+        self.render_cache = RenderCache()
+        self._index_catalog()
+        
         print(f"Files initialized: {len(self.files_by_tier)} tiers, {len(self.global_files)} global files")
+        
+        # Optional mirroring of tiers into Discord roles. With ROLE_ENTITLEMENTS
+        # a member's tier roles decide their files without a storage read
+        self.role_sync = RoleSync(self.sender, list(self.files_by_tier), prefix=os.getenv('TIER_ROLE_PREFIX', ''))
+        self.role_sync_enabled = os.getenv('ROLE_SYNC', '').lower() in ('1', 'true', 'yes')
+        self.role_entitlements = os.getenv('ROLE_ENTITLEMENTS', '').lower() in ('1', 'true', 'yes')
+        
+        # Last tier mask seen per user, so autocomplete never touches storage
+        self._tier_masks = {}
+        
+        # Anything that blocks the event loop longer than this gets its stack sampled
+        self.loop_monitor = LoopMonitor(threshold=int(os.getenv('LOOP_LAG_THRESHOLD_MS', '250')) / 1000)
+        self.profiler = SamplingProfiler()
+    
+    async def _load_config(self, migrate: bool = False):
+        """Load bot configuration from the state backend, shared by every process"""
+        legacy = await storage.read_json(self.config_file, {}) if migrate else {}
+        for key in CONFIG_KEYS:
+            value = await self.state.get_value('config', key)
+            if value is None and legacy.get(key) is not None:
+                value = legacy[key]
+                await self.state.set_value('config', key, value)
+            setattr(self, key, value)
+    
+    async def _save_config(self, key: str):
+        """Save one bot setting, each is its own key so processes never undo each other"""
+        await self.state.set_value('config', key, getattr(self, key))
+    
+    async def get_user_record(self, user_id: int) -> Optional[dict]:
+        """Get a user's record from the state backend"""
+        return await self.state.get_user(str(user_id))
+    
+    async def get_record(self, user_id: int) -> Optional[UserRecord]:
+        """Get a user's compact record, for entitlement checks"""
+        return await self.state.get_record(str(user_id))
+    
+    async def update_user_record(self, user_id: int, fields: dict, defaults: Optional[dict] = None):
+        """Set some fields of a user's record, keeping the others (like pending bans)"""
+        await self.state.update_user(str(user_id), fields, defaults)
+        if 'tiers' in fields:
+            self._tier_masks[user_id] = tier_catalog.mask_for(fields['tiers'])
+        if self.role_sync_enabled and 'tiers' in fields:
+            self.spawn(self._sync_roles({user_id: fields['tiers']}))
     
-    def _load_config(self):
-        """Load bot configuration"""
-        if os.path.exists(self.config_file):
+    def spawn(self, coro) -> asyncio.Task:
+        """Run a coroutine in the background, holding a reference until it finishes"""
+        task = self.bot.loop.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_task_done)
+        return task
+    
+    def _background_task_done(self, task: asyncio.Task):
+        self._background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[TASK] {task.get_coro().__qualname__} failed: {task.exception()!r}")
+    
+    async def _sync_roles(self, tiers_by_user: dict) -> tuple[int, int]:
+        """Bring members' tier roles in line with their records in every guild"""
+        changed = failed = 0
+        for guild in self.bot.guilds:
             try:
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    self.log_channel_id = config.get('log_channel_id')
-            except:
-                pass
-    
-    def _save_config(self):
-        """Save bot configuration"""
-        config = {
-            'log_channel_id': self.log_channel_id
-        }
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f, indent=2)
+                guild_changed, guild_failed = await self.role_sync.sync_all(guild, tiers_by_user)
+            except Exception as e:
+                print(f"[ROLES] Sync in {guild.id} failed: {e}")
+                continue
+            changed += guild_changed
+            failed += guild_failed
+        return changed, failed
+    
+    async def resolve_tier_mask(self, user: discord.abc.User) -> Optional[int]:
+        """Tier mask for a user, None if they are not verified"""
+        if self.role_entitlements and isinstance(user, discord.Member):
+            mask = self.role_sync.mask_for_member(user)
+            if mask:
+                metrics.incr("entitlement.roles")
+                return mask
+        
+        metrics.incr("entitlement.storage")
+        record = await self.get_record(user.id)
+        if record is None:
+            self._tier_masks.pop(user.id, None)
+            return None
+        self._tier_masks[user.id] = record.tier_mask
+        return record.tier_mask
     
     def check_ban_status(self, user_id: int) -> Optional[str]:
         """Check if a user is temporarily banned"""
-        if not os.path.exists(self.user_data_file):
-            return None
-            
-        try:
-            with open(self.user_data_file, 'r') as f:
-                all_data = json.load(f)
-        except:
-            return None
-            
-        user_data = all_data.get(str(user_id))
-        if not user_data:
+        expires_at = self.expiry_scheduler.get(BAN, user_id)
+        if expires_at is None:
             return None
-            
-        ban_expiry = user_data.get('ban_expiry')
-        if ban_expiry:
-            expiry_dt = datetime.fromisoformat(ban_expiry)
-            if expiry_dt > datetime.now():
-                # Use Discord's relative timestamp for countdown
-                timestamp = int(expiry_dt.timestamp())
-                
-                # Calculate precise remaining time
-                remaining = expiry_dt - datetime.now()
-                total_seconds = int(remaining.total_seconds())
-                
-                days = total_seconds // 86400
-                remaining_seconds = total_seconds % 86400
-                hours = remaining_seconds // 3600
-                remaining_seconds = remaining_seconds % 3600
-                minutes = remaining_seconds // 60
-                seconds = remaining_seconds % 60
-                
-                parts = []
-                if days > 0:
-                    parts.append(f"{days}d")
-                if hours > 0:
-                    parts.append(f"{hours}h")
-                if minutes > 0:
-                    parts.append(f"{minutes}m")
-                parts.append(f"{seconds}s")
-                
-                time_str = " ".join(parts)
-                
-                return f"⛔ **Access Denied**: You are temporarily banned from downloading files.\n**Time Remaining**: {time_str} (<t:{timestamp}:R>)"
         
-        return None
-
-        return None
+        # Use Discord's relative timestamp for countdown
+        timestamp = int(expires_at)
+        
+        # Calculate precise remaining time
+        total_seconds = int(expires_at - time.time())
+        
+        days = total_seconds // 86400
+        remaining_seconds = total_seconds % 86400
+        hours = remaining_seconds // 3600
+        remaining_seconds = remaining_seconds % 3600
+        minutes = remaining_seconds // 60
+        seconds = remaining_seconds % 60
+        
+        parts = []
+        if days > 0:
+            parts.append(f"{days}d")
+        if hours > 0:
+            parts.append(f"{hours}h")
+        if minutes > 0:
+            parts.append(f"{minutes}m")
+        parts.append(f"{seconds}s")
+        
+        time_str = " ".join(parts)
+        
+        return f"⛔ **Access Denied**: You are temporarily banned from downloading files.\n**Time Remaining**: {time_str} (<t:{timestamp}:R>)"
 
     def check_temp_access(self, user_id: int) -> tuple[bool, Optional[datetime]]:
         """Check if user has temporary full access"""
-        if not os.path.exists(self.user_data_file):
+        expires_at = self.expiry_scheduler.get(ACCESS, user_id)
+        if expires_at is None:
             return False, None
-            
+        return True, datetime.fromtimestamp(expires_at)
+
+    async def _on_expiry(self, kind: str, user_id: int, expires_at: float):
+        """Clean up an expired temp ban / temp access and notify the user"""
+        # Another process sharing the backend may have handled it already, or
+        # extended it since our copy of the expiries was last resynced
+        if not await self.state.clear_field(str(user_id), kind, expected=expires_at):
+            return
+        
+        if kind == BAN:
+            label = "Temp Ban Expired"
+            dm_text = "✅ **Your temporary download ban has expired.** You can download files again!"
+        else:
+            label = "Temp Access Expired"
+            dm_text = "⌛ **Your temporary access has expired.** Use `/verify` to link your Patreon account."
+        
+        print(f"[EXPIRY] {label} for {user_id}")
+        
+        user = self.bot.get_user(user_id)
         try:
-            with open(self.user_data_file, 'r') as f:
-                all_data = json.load(f)
+            if not user:
+                user = await self.bot.fetch_user(user_id)
+            dm = await user.create_dm()
+            await self.sender.submit(DM, dm.send, dm_text, route=f"dm:{user_id}")
         except:
-            return False, None
-            
-        user_data = all_data.get(str(user_id))
-        if not user_data:
-            return False, None
-            
-        access_expiry = user_data.get('access_expiry')
-        if access_expiry:
-            expiry_dt = datetime.fromisoformat(access_expiry)
-            if expiry_dt > datetime.now():
-                return True, expiry_dt
+            pass
         
-        return False, None
+        await self.log_action(
+            f"**{label}**\n"
+            f"User: <@{user_id}>",
+            user,
+            discord.Color.orange()
+        )
 
     def get_all_files(self) -> List[FileDetails]:
         """Get all available files"""
@@ -765,7 +857,8 @@ class PatreonCog(commands.Cog):
             if user:
                 embed.set_footer(text=f"User: {user} (ID: {user.id})", icon_url=user.display_avatar.url)
             
-            await channel.send(embed=embed)
+            # Logs are lowest priority and never block the caller
+            self.sender.enqueue(LOG, channel.send, embed=embed, route="log")
         except:
             pass
     
@@ -773,85 +866,114 @@ class PatreonCog(commands.Cog):
         """Called when cog is loaded"""
         print("PatreonCog loaded successfully!")
         
+        await self.state.open()
+        await self._load_config(migrate=True)
+        self.expiry_scheduler.load(await self.state.load_expiries())
+        print(f"Expiry scheduler loaded: {len(self.expiry_scheduler)} pending expiries")
+        
         # Register persistent views
-        self.bot.add_view(PersistentSetupView(self))
+        self.persistent_view = PersistentSetupView(self)
+        self.bot.add_view(self.persistent_view)
+        self.bot.add_dynamic_items(DownloadAllButton, FileDownloadButton, PageButton)
         print("Persistent views registered")
-        
-        if self.patreon_access_token and not self.patreon_campaign_id:
-            print("⚠️ Campaign ID not found in .env, will auto-fetch on first use...")
-            self.bot.loop.create_task(self._fetch_campaign_id_on_startup())
+
+        self.spawn(self._start_expiry_scheduler())
+        self.dm_queue.start()
+        self.loop_monitor.start()
+        
+        # Campaign id and tiers from the last run, refreshed in the background
+        await self._load_campaign()
+        if self.patreon_access_token:
+            if not self.patreon_campaign_id:
+                print("⚠️ Campaign ID not found in .env, fetching it in the background...")
+            self.refresh_campaign_loop.start()
     
-    async def _fetch_campaign_id_on_startup(self):
-        """Fetch campaign ID in background on startup"""
+    async def cog_unload(self):
+        """Called when cog is unloaded"""
+        self.expiry_scheduler.stop()
+        self.resync_expiries.cancel()
+        self.refresh_campaign_loop.cancel()
+        self.bot.remove_dynamic_items(DownloadAllButton, FileDownloadButton, PageButton)
+        self.dm_queue.stop()
+        self.loop_monitor.stop()
+        for task in list(self._background_tasks):
+            task.cancel()
+        await self.file_cache.close()
+        await self.state.close()
+
+    async def _start_expiry_scheduler(self):
+        """Start firing expiries once the bot can DM users and log"""
         await self.bot.wait_until_ready()
-        if not self.patreon_campaign_id and self.patreon_access_token:
-            print("\n" + "="*60)
-            print("FETCHING CAMPAIGN ID ON STARTUP")
-            print("="*60)
-            success, error = await self.ensure_campaign_id()
-            if not success:
-                print(f"⚠️ Failed to auto-fetch campaign ID: {error}")
-            print("="*60 + "\n")
+        self.expiry_scheduler.start()
+        print("Expiry scheduler started")
+        
+        # Pick up bans / temp access changed by other processes
+        if self.state.shared:
+            self.resync_expiries.start()
+    
+    @tasks.loop(seconds=30)
+    async def resync_expiries(self):
+        """Reload pending expiries and bot configuration from a shared state backend"""
+        self.expiry_scheduler.load(await self.state.load_expiries())
+        await self._load_config()
+
+    async def _load_campaign(self):
+        """Campaign id and tier catalog saved by a previous run"""
+        cached = await self.state.get_value('patreon', 'campaign')
+        if not cached:
+            return
+        
+        # An explicit PATREON_CAMPAIGN_ID wins over one discovered before
+        if self.patreon_campaign_id and cached.get('id') != self.patreon_campaign_id:
+            return
+        
+        self.patreon_campaign_id = cached['id']
+        self.campaign_name = cached.get('name')
+        self.campaign_tiers.update(cached.get('tiers', {}), cached.get('fetched_at'))
+        print(f"Campaign loaded from state: {self.campaign_name} ({len(self.campaign_tiers)} tiers)")
+    
+    @tasks.loop(minutes=30)
+    async def refresh_campaign_loop(self):
+        """Keep the campaign id and tier catalog within their TTL"""
+        await self._refresh_campaign_in_background()
+    
+    async def _refresh_campaign_in_background(self):
+        error = await self.refresh_campaign(max_age=CAMPAIGN_TTL)
+        if error:
+            print(f"⚠️ Campaign refresh failed: {error}")
+    
+    async def refresh_campaign(self, max_age: float = 0, attempts: int = 3) -> Optional[str]:
+        """Fetch and persist the campaign id and tier catalog if older than `max_age` seconds"""
+        async with self._campaign_lock:
+            # Someone else may have refreshed it while we waited for the lock
+            if self.patreon_campaign_id and self.campaign_tiers.age() < max_age:
+                return None
+            
+            campaign, error = await fetch_campaign(
+                PATREON_API_BASE, self.patreon_access_token, self.patreon_campaign_id, attempts=attempts
+            )
+            if error:
+                return error
+            
+            self.patreon_campaign_id = campaign['id']
+            self.campaign_name = campaign['name']
+            self.campaign_tiers.update(campaign['tiers'])
+            await self.state.set_value('patreon', 'campaign', {**campaign, 'fetched_at': self.campaign_tiers.fetched_at})
+            print(f"[PATREON] Campaign {campaign['name']} ({campaign['id']}): {len(campaign['tiers'])} tiers")
+            return None
     
     async def ensure_campaign_id(self) -> tuple[bool, Optional[str]]:
-        """Ensure we have a campaign ID"""
+        """Ensure we have a campaign ID, without waiting for discovery"""
         if self.patreon_campaign_id:
             return True, None
         
-        if self._campaign_id_fetched:
-            return False, "❌ **Configuration Error**: Campaign ID could not be determined."
-        
-        self._campaign_id_fetched = True
-        
         if not self.patreon_access_token:
             return False, "❌ **Configuration Error**: Patreon access token not configured."
         
-        print("🔍 Auto-fetching Campaign ID...")
-        print(f"   Using Access Token: {self.patreon_access_token[:20]}...")
-        
-        try:
-            async with aiohttp.ClientSession() as session:
-                headers = {'Authorization': f'Bearer {self.patreon_access_token}'}
-                url = 'https://www.patreon.com/api/oauth2/v2/campaigns'
-                
-                print(f"   Making request to: {url}")
-                
-                async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=5)) as response:
-                    print(f"   Response Status: {response.status}")
-                    response_text = await response.text()
-                    print(f"   Response Body: {response_text[:500]}")
-                    
-                    if response.status == 401:
-                        print("   ❌ Authentication failed")
-                        return False, "❌ **Authentication Error**: Invalid access token."
-                    
-                    if response.status != 200:
-                        return False, f"❌ **API Error**: Status {response.status}"
-                    
-                    try:
-                        data = await response.json()
-                    except Exception as e:
-                        return False, f"❌ **Parse Error**: {str(e)}"
-                    
-                    campaigns = data.get('data', [])
-                    print(f"   Found {len(campaigns)} campaign(s)")
-                    
-                    if not campaigns:
-                        return False, "❌ **No Campaigns Found**"
-                    
-                    self.patreon_campaign_id = campaigns[0]['id']
-                    campaign_name = campaigns[0].get('attributes', {}).get('creation_name', 'Unknown')
-                    
-                    print(f"   ✅ Campaign ID: {self.patreon_campaign_id}")
-                    print(f"   ✅ Campaign Name: {campaign_name}")
-                    
-                    return True, None
-                    
-        except asyncio.TimeoutError:
-            return False, "❌ **Timeout Error**"
-        except Exception as e:
-            print(f"   ❌ Exception: {type(e).__name__}: {str(e)}")
-            return False, f"❌ **Error**: {str(e)}"
+        # Discovery runs in the background, retried until it works
+        if not self._campaign_lock.locked():
+            self.spawn(self._refresh_campaign_in_background())
+        return False, "⏳ **Still Connecting to Patreon**: Please try again in a minute."
     
     async def get_patreon_tiers(self, email: str) -> tuple[List[str], Optional[str]]:
         """Get user's Patreon tiers by email"""
@@ -869,26 +991,19 @@ class PatreonCog(commands.Cog):
             timeout = aiohttp.ClientTimeout(total=20)
             
             async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
-                base_url = f'https://www.patreon.com/api/oauth2/v2/campaigns/{self.patreon_campaign_id}/members'
-                params = {
-                    'include': 'currently_entitled_tiers',
-                    'fields[member]': 'full_name,email,patron_status',
-                    'fields[tier]': 'title,amount_cents',
-                    'page[count]': 100
-                }
+                base_url = f'{PATREON_API_BASE}/campaigns/{self.patreon_campaign_id}/members'
                 
                 print("\n" + "="*60)
                 print(f"VERIFYING PATRON: {email}")
                 print("="*60)
                 
                 all_members = []
-                all_included = []
                 page_num = 1
                 next_cursor = None
                 
                 while True:
-                    if next_cursor:
-                        params['page[cursor]'] = next_cursor
+                    # Only email, status and tier ids, titles come from the tier catalog
+                    params = member_params('verify', cursor=next_cursor)
                     
                     print(f"\nFetching page {page_num}...")
                     
@@ -898,12 +1013,11 @@ class PatreonCog(commands.Cog):
                         if response.status != 200:
                             return [], f"❌ **API Error**: Status {response.status}"
                         
-                        data = await response.json()
+                        data = await response.json(loads=codec.loads)
                         members_count = len(data.get('data', []))
                         print(f"Members in this page: {members_count}")
                         
                         all_members.extend(data.get('data', []))
-                        all_included.extend(data.get('included', []))
                         
                         pagination = data.get('meta', {}).get('pagination', {})
                         next_cursor = pagination.get('cursors', {}).get('next')
@@ -925,15 +1039,15 @@ class PatreonCog(commands.Cog):
                         if patron_status not in ['active_patron', 'former_patron']:
                             return [], f"❌ **Inactive**: Status is '{patron_status}'"
                         
-                        tier_rels = member.get('relationships', {}).get('currently_entitled_tiers', {}).get('data', [])
+                        tier_ids = member_tier_ids(member)
                         
-                        for tier_ref in tier_rels:
-                            tier_id = tier_ref.get('id')
-                            for included in all_included:
-                                if included.get('type') == 'tier' and included.get('id') == tier_id:
-                                    tier_title = included.get('attributes', {}).get('title', '')
-                                    if tier_title and tier_title not in tiers:
-                                        tiers.append(tier_title)
+                        # A tier added since the last refresh, refetched at most once a minute
+                        if self.campaign_tiers.missing(tier_ids):
+                            error = await self.refresh_campaign(max_age=60, attempts=1)
+                            if error:
+                                print(f"⚠️ Tier catalog refresh failed: {error}")
+                        
+                        tiers = self.campaign_tiers.titles_for(tier_ids)
                         
                         if not tiers:
                             return [], "❌ **No Tiers Found**"
@@ -950,12 +1064,21 @@ class PatreonCog(commands.Cog):
     
     def get_files_for_tiers(self, tiers: List[str]) -> List[FileDetails]:
         """Get files for tiers"""
+        return self.get_files_for_mask(tier_catalog.mask_for(tiers))
+    
+    def get_files_for_mask(self, mask: int) -> List[FileDetails]:
+        """Get files for a tier bitmask, cached per distinct mask"""
+        mask &= self._file_tier_mask
+        files = self._files_by_mask.get(mask)
+        if files is not None:
+            return files
+        
         files = []
         seen = set()
         
-        for tier in tiers:
-            if tier in self.files_by_tier:
-                for file in self.files_by_tier[tier]:
+        for tier, tier_files in self.files_by_tier.items():
+            if tier_catalog.bit_for(tier) & mask:
+                for file in tier_files:
                     if file.link not in seen:
                         files.append(file)
                         seen.add(file.link)
@@ -965,15 +1088,212 @@ class PatreonCog(commands.Cog):
                 files.append(file)
                 seen.add(file.link)
         
+        self._files_by_mask[mask] = files
         return files
     
-    async def download_file(self, url: str) -> Optional[bytes]:
-        """Download a file"""
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    return await response.read()
-        return None
+    def entitlement_key(self, mask: Optional[int]) -> int:
+        """Cache key for the files a mask gives, -1 for every file"""
+        return -1 if mask is None else mask & self._file_tier_mask
+    
+    def _index_catalog(self):
+        """File lookup by id, and a version that changes with the catalog"""
+        files = self.get_all_files()
+        self.files_by_id = {file.id: file for file in files}
+        # Derived from the contents so it is the same after a restart
+        self.catalog_version = zlib.crc32("\n".join(f"{f.tier}|{f.name}|{f.link}" for f in files).encode())
+    
+    def invalidate_catalog(self):
+        """Drop everything derived from the file catalog
+        
+        The catalog is fixed at startup, call this after editing
+        files_by_tier / global_files on a running cog.
+        """
+        self._index_catalog()
+        self._files_by_mask.clear()
+        self._file_indexes.clear()
+        self.render_cache.invalidate()
+        print(f"[CATALOG] Catalog changed, now version {self.catalog_version}")
+    
+    def get_files_embed(self, layout: str, mask: Optional[int], files: List[FileDetails], footer: str) -> discord.Embed:
+        """"Your Available Files" embed for a layout ('panel', 'setup' or 'list')
+        
+        The body is cached per entitlement. Footers can be per user (temp
+        access expiry), so they go on a copy instead of into the cache key.
+        """
+        key = ('files', layout, self.entitlement_key(mask))
+        embed = self.render_cache.get(key, lambda: self._build_files_embed(layout, files)).copy()
+        embed.set_footer(text=footer)
+        return embed
+    
+    def _build_files_embed(self, layout: str, files: List[FileDetails]) -> discord.Embed:
+        descriptions = {
+            'panel': f"You have access to **{len(files)}** files\n\nSelect download option below:",
+            'setup': f"You have access to **{len(files)}** files\n\nSelect files to download below:",
+            'list': f"You have access to **{len(files)}** files"
+        }
+        embed = discord.Embed(
+            title="📂 Your Available Files",
+            description=descriptions[layout],
+            color=discord.Color.blue()
+        )
+        
+        # Group files by tier
+        files_by_tier = {}
+        for file in files:
+            if file.tier not in files_by_tier:
+                files_by_tier[file.tier] = []
+            files_by_tier[file.tier].append(file.name)
+        
+        # Panels show the first 5 tiers, the panel button at most 10 files each
+        groups = list(files_by_tier.items())
+        if layout != 'list':
+            groups = groups[:5]
+        for tier, file_names in groups:
+            shown = file_names[:10] if layout == 'panel' else file_names
+            file_list = "\n".join([f"• {name}" for name in shown])
+            if len(file_names) > len(shown):
+                file_list += f"\n... and {len(file_names) - len(shown)} more"
+            embed.add_field(name=f"📁 {tier}", value=file_list, inline=False)
+        
+        return embed
+    
+    async def get_entitled_files(self, user: discord.abc.User) -> tuple[Optional[int], Optional[List[FileDetails]]]:
+        """(mask, files) a user can download right now, files is None if not verified"""
+        if self.check_temp_access(user.id)[0]:
+            return None, self.get_all_files()
+        mask = await self.resolve_tier_mask(user)
+        if mask is None:
+            return None, None
+        return mask, self.get_files_for_mask(mask)
+    
+    def get_file_index(self, mask: Optional[int]) -> FileIndex:
+        """Search index over the files of a tier mask, None means every file"""
+        key = self.entitlement_key(mask)
+        index = self._file_indexes.get(key)
+        if index is None:
+            files = self.get_all_files() if mask is None else self.get_files_for_mask(mask)
+            index = FileIndex([file.name for file in files])
+            self._file_indexes[key] = index
+        return index
+    
+    def cached_tier_mask(self, user: discord.abc.User) -> Optional[int]:
+        """Tier mask known without I/O, None (every file) only for temp access"""
+        if self.check_temp_access(user.id)[0]:
+            return None
+        if self.role_entitlements and isinstance(user, discord.Member):
+            mask = self.role_sync.mask_for_member(user)
+            if mask:
+                return mask
+        mask = self._tier_masks.get(user.id)
+        if mask is not None:
+            return mask
+        record = self.state.cached_record(str(user.id))
+        # Users not seen yet only get the global files until their next lookup
+        return record.tier_mask if record else 0
+    
+    def get_upload_limit(self, guild: Optional[discord.Guild]) -> int:
+        """Max upload size in bytes into a guild's channels, raised by its boost tier
+        
+        The boost only applies inside that guild, DMs (guild None) get the default.
+        """
+        if guild is None:
+            return DEFAULT_UPLOAD_LIMIT
+        return max(DEFAULT_UPLOAD_LIMIT, guild.filesize_limit)
+    
+    def get_storage_limit(self) -> int:
+        """Max size of a file the storage channel accepts, 0 without one"""
+        channel = self.bot.get_channel(self.storage_channel_id) if self.storage_channel_id else None
+        if channel is None:
+            return 0
+        return self.get_upload_limit(getattr(channel, 'guild', None))
+    
+    def get_delivery_limit(self, upload_limit: int) -> int:
+        """Largest file worth downloading: one that can be uploaded directly or stored and linked"""
+        return max(upload_limit, self.get_storage_limit())
+    
+    async def download_file(self, url: str, limit: int = DEFAULT_UPLOAD_LIMIT) -> tuple[Optional[CachedFile], Optional[int]]:
+        """Download a file into the on-disk cache
+        
+        Returns (file, None), or (None, size) when the file is over `limit`
+        bytes, in which case the download stops as soon as that is known.
+        (None, None) on failure.
+        """
+        try:
+            cached = await self.file_cache.fetch(url, max_size=limit)
+        except FileTooLarge as e:
+            metrics.incr("delivery.oversize_skipped")
+            return None, e.size
+        except Exception as e:
+            print(f"[DOWNLOAD] Error fetching {url}: {e}")
+            return None, None
+        return cached, None
+    
+    async def get_stored_message(self, cached: CachedFile) -> Optional[discord.PartialMessage]:
+        """Storage channel message holding this file version, uploading it once if needed"""
+        if not self.storage_channel_id:
+            return None
+        channel = self.bot.get_channel(self.storage_channel_id)
+        if not channel:
+            return None
+        if cached.size > self.get_upload_limit(getattr(channel, 'guild', None)):
+            return None
+        
+        entry = self._storage_locks.get(cached.digest)
+        if entry is None:
+            entry = self._storage_locks[cached.digest] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await self._upload_to_storage(channel, cached)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._storage_locks[cached.digest]
+    
+    async def _upload_to_storage(self, channel, cached: CachedFile):
+        """Upload `cached` unless a copy already sits in the storage channel"""
+        entry = await self.attachment_store.get(cached.digest)
+        if entry and entry['channel_id'] == channel.id:
+            return channel.get_partial_message(entry['message_id'])
+        
+        try:
+            message = await self.sender.submit(
+                DM, channel.send,
+                f"`{cached.filename}` • `{cached.digest[:12]}`",
+                file=cached.to_discord_file(),
+                route="storage"
+            )
+        except discord.HTTPException as e:
+            print(f"[STORAGE] Upload failed for {cached.filename}: {e}")
+            return None
+        
+        metrics.incr("delivery.storage_uploads")
+        await self.attachment_store.put(cached.digest, channel.id, message.id, message.attachments[0].url, cached.filename)
+        return channel.get_partial_message(message.id)
+    
+    async def get_attachment_url(self, cached: CachedFile) -> Optional[str]:
+        """Signed CDN URL of the stored copy, refreshed when close to expiring"""
+        message = await self.get_stored_message(cached)
+        if message is None:
+            return None
+        
+        entry = await self.attachment_store.get(cached.digest)
+        expires_at = url_expires_at(entry['url'])
+        if expires_at is None or expires_at - time.time() > 3600:
+            return entry['url']
+        
+        try:
+            fresh = await message.fetch()
+        except discord.NotFound:
+            await self.attachment_store.forget(cached.digest)
+            return None
+        except discord.HTTPException:
+            return None
+        
+        metrics.incr("delivery.url_refreshed")
+        url = fresh.attachments[0].url
+        await self.attachment_store.update_url(cached.digest, url)
+        return url
     
     async def get_version(self, version_url: str) -> str:
         """Get version string"""
@@ -988,36 +1308,19 @@ class PatreonCog(commands.Cog):
     @app_commands.default_permissions(administrator=True)
     async def setup(self, interaction: discord.Interaction):
         """Interactive setup - creates persistent view if used by admin in channel"""
+        if not await acknowledge(interaction):
+            return
+        
         try:
             # Check if user is admin
             is_admin = interaction.user.guild_permissions.administrator if interaction.guild else False
             
             if is_admin and interaction.channel:
                 # Admin using in channel - create persistent public view
-                await interaction.response.defer(ephemeral=True)
-                
-                embed = discord.Embed(
-                    title="🎮 Patreon Access Panel",
-                    description="Welcome! Use the buttons below to verify your Patreon subscription and download your files.",
-                    color=discord.Color.gold()
-                )
-                embed.add_field(
-                    name="📧 Verify Email",
-                    value="Click to verify your Patreon account",
-                    inline=False
-                )
-                embed.add_field(
-                    name="📂 Download Files",
-                    value="View and download your available files",
-                    inline=False
-                )
-                embed.set_footer(text="This panel will remain active permanently")
+                embed = self.render_cache.get('setup_panel', self._build_panel_embed)
                 
-                # Create persistent view (timeout=None)
-                view = PersistentSetupView(self)
-                
-                # Send to channel (not ephemeral)
-                await interaction.channel.send(embed=embed, view=view)
+                # The registered persistent view handles clicks on every panel
+                await interaction.channel.send(embed=embed, view=self.persistent_view)
                 await interaction.followup.send("✅ Setup panel created!", ephemeral=True)
                 
                 await self.log_action(
@@ -1027,39 +1330,59 @@ class PatreonCog(commands.Cog):
                 )
             else:
                 # Regular user - show ephemeral personal view
-                await interaction.response.defer(ephemeral=True)
-                
-                embed = discord.Embed(
-                    title="🎮 Patreon Bot Setup",
-                    description="Welcome! Choose an option below to get started.",
-                    color=discord.Color.blue()
-                )
-                embed.add_field(
-                    name="📧 Verify Email",
-                    value="Link your Patreon account",
-                    inline=False
-                )
-                embed.add_field(
-                    name="📂 Show Files",
-                    value="View your available files",
-                    inline=False
-                )
+                embed = self.render_cache.get('setup_personal', self._build_setup_embed)
                 
                 view = SetupView(self)
                 await interaction.followup.send(embed=embed, view=view, ephemeral=True)
+                self.views.track(interaction.user.id, 'setup', view)
         except Exception as e:
             print(f"Setup error: {e}")
     
+    def _build_panel_embed(self) -> discord.Embed:
+        """Build the public setup panel embed"""
+        embed = discord.Embed(
+            title="🎮 Patreon Access Panel",
+            description="Welcome! Use the buttons below to verify your Patreon subscription and download your files.",
+            color=discord.Color.gold()
+        )
+        embed.add_field(
+            name="📧 Verify Email",
+            value="Click to verify your Patreon account",
+            inline=False
+        )
+        embed.add_field(
+            name="📂 Download Files",
+            value="View and download your available files",
+            inline=False
+        )
+        embed.set_footer(text="This panel will remain active permanently")
+        return embed
+    
+    def _build_setup_embed(self) -> discord.Embed:
+        """Build the personal /setup embed"""
+        embed = discord.Embed(
+            title="🎮 Patreon Bot Setup",
+            description="Welcome! Choose an option below to get started.",
+            color=discord.Color.blue()
+        )
+        embed.add_field(
+            name="📧 Verify Email",
+            value="Link your Patreon account",
+            inline=False
+        )
+        embed.add_field(
+            name="📂 Show Files",
+            value="View your available files",
+            inline=False
+        )
+        return embed
+    
     @app_commands.command(name="grantaccess", description="[Admin] Grant full access to a user")
     @app_commands.guild_only()
     @app_commands.default_permissions(administrator=True)
+    @deferred()
     async def grant_access(self, interaction: discord.Interaction, user: discord.Member):
         """Admin command to grant full access"""
-        try:
-            await interaction.response.defer(ephemeral=True)
-        except:
-            return
-        
         # Grant all tiers
         all_tiers = list(self.files_by_tier.keys())
         
@@ -1071,18 +1394,8 @@ class PatreonCog(commands.Cog):
             'granted_by': interaction.user.id
         }
         
-        all_data = {}
-        if os.path.exists(self.user_data_file):
-            try:
-                with open(self.user_data_file, 'r') as f:
-                    all_data = json.load(f)
-            except:
-                pass
-        
-        all_data[str(user.id)] = user_data
-        
-        with open(self.user_data_file, 'w') as f:
-            json.dump(all_data, f, indent=2)
+        # Pending bans / temp access are kept, the scheduler still tracks them
+        await self.update_user_record(user.id, user_data)
         
         embed = discord.Embed(
             title="✅ Access Granted",
@@ -1108,10 +1421,12 @@ class PatreonCog(commands.Cog):
         # Try to notify user
         try:
             dm = await user.create_dm()
-            await dm.send(
+            await self.sender.submit(
+                DM, dm.send,
                 f"🎉 **You've been granted full access!**\n\n"
                 f"An administrator has given you access to all Patreon files.\n"
-                f"Use `/setup` to download your files!"
+                f"Use `/setup` to download your files!",
+                route=f"dm:{user.id}"
             )
         except:
             pass
@@ -1133,41 +1448,18 @@ class PatreonCog(commands.Cog):
     @app_commands.command(name="tempban", description="[Admin] Temporarily ban a user from downloading files")
     @app_commands.guild_only()
     @app_commands.default_permissions(administrator=True)
+    @deferred()
     async def tempban(self, interaction: discord.Interaction, user: discord.Member, days: int):
         """Temp ban a user"""
-        try:
-            await interaction.response.defer(ephemeral=True)
-        except:
-            return
-
         if days <= 0:
             await interaction.followup.send("❌ **Error**: Days must be positive", ephemeral=True)
             return
 
-        # Load data
-        all_data = {}
-        if os.path.exists(self.user_data_file):
-            try:
-                with open(self.user_data_file, 'r') as f:
-                    all_data = json.load(f)
-            except:
-                pass
-        
-        user_id_str = str(user.id)
-        if user_id_str not in all_data:
-            # Create basic entry if not exists
-            all_data[user_id_str] = {
-                'discord_id': user.id,
-                'email': 'unknown',
-                'tiers': []
-            }
-        
-        # Set expiry
+        # Set expiry, creating a basic entry if none exists
         expiry = datetime.now() + timedelta(days=days)
-        all_data[user_id_str]['ban_expiry'] = expiry.isoformat()
+        await self.update_user_record(user.id, {BAN: expiry.isoformat()}, defaults={'email': 'unknown'})
         
-        with open(self.user_data_file, 'w') as f:
-            json.dump(all_data, f, indent=2)
+        self.expiry_scheduler.schedule(BAN, user.id, expiry.timestamp())
             
         await interaction.followup.send(
             f"✅ **Banned**: {user.mention} is banned from downloads for {days} days.\n"
@@ -1188,32 +1480,15 @@ class PatreonCog(commands.Cog):
     @app_commands.command(name="removetempban", description="[Admin] Remove a temporary ban from a user")
     @app_commands.guild_only()
     @app_commands.default_permissions(administrator=True)
+    @deferred()
     async def remove_temp_ban(self, interaction: discord.Interaction, user: discord.Member):
         """Remove temp ban from a user"""
-        try:
-            await interaction.response.defer(ephemeral=True)
-        except:
-            return
-
-        all_data = {}
-        if os.path.exists(self.user_data_file):
-            try:
-                with open(self.user_data_file, 'r') as f:
-                    all_data = json.load(f)
-            except:
-                pass
-        
-        user_id_str = str(user.id)
-        
-        if user_id_str not in all_data or 'ban_expiry' not in all_data[user_id_str]:
+        # Remove ban_expiry
+        if not await self.state.clear_field(str(user.id), BAN):
             await interaction.followup.send(f"❌ **{user.mention}** is not currently banned.", ephemeral=True)
             return
-            
-        # Remove ban_expiry
-        del all_data[user_id_str]['ban_expiry']
         
-        with open(self.user_data_file, 'w') as f:
-            json.dump(all_data, f, indent=2)
+        self.expiry_scheduler.cancel(BAN, user.id)
             
         await interaction.followup.send(
             f"✅ **Unbanned**: Temporary ban removed for {user.mention}.",
@@ -1239,40 +1514,18 @@ class PatreonCog(commands.Cog):
     @app_commands.command(name="granttempaccess", description="[Admin] Grant temporary full access to a user")
     @app_commands.guild_only()
     @app_commands.default_permissions(administrator=True)
+    @deferred()
     async def grant_temp_access(self, interaction: discord.Interaction, user: discord.Member, days: int):
         """Grant temporary full access to a user"""
-        try:
-            await interaction.response.defer(ephemeral=True)
-        except:
-            return
-
         if days <= 0:
             await interaction.followup.send("❌ **Error**: Days must be positive", ephemeral=True)
             return
 
-        # Load data
-        all_data = {}
-        if os.path.exists(self.user_data_file):
-            try:
-                with open(self.user_data_file, 'r') as f:
-                    all_data = json.load(f)
-            except:
-                pass
-        
-        user_id_str = str(user.id)
-        if user_id_str not in all_data:
-            all_data[user_id_str] = {
-                'discord_id': user.id,
-                'email': 'temp_access',
-                'tiers': []
-            }
-        
-        # Set expiry
+        # Set expiry, creating a basic entry if none exists
         expiry = datetime.now() + timedelta(days=days)
-        all_data[user_id_str]['access_expiry'] = expiry.isoformat()
+        await self.update_user_record(user.id, {ACCESS: expiry.isoformat()}, defaults={'email': 'temp_access'})
         
-        with open(self.user_data_file, 'w') as f:
-            json.dump(all_data, f, indent=2)
+        self.expiry_scheduler.schedule(ACCESS, user.id, expiry.timestamp())
             
         timestamp = int(expiry.timestamp())
         
@@ -1295,27 +1548,220 @@ class PatreonCog(commands.Cog):
         # Try to notify user
         try:
             dm = await user.create_dm()
-            await dm.send(
+            await self.sender.submit(
+                DM, dm.send,
                 f"🎉 **Temporary Access Granted!**\n\n"
                 f"You have been given full access to all files for {days} days.\n"
                 f"Expires: <t:{timestamp}:F>\n"
-                f"Use `/files` in the server to see downloads!"
+                f"Use `/files` in the server to see downloads!",
+                route=f"dm:{user.id}"
             )
         except:
             pass
 
-    @app_commands.command(name="setlogchannel", description="[Admin] Set the logging channel")
+    async def _resolve_bulk_targets(self, role: Optional[discord.Role], user_ids: Optional[str],
+                                    csv_file: Optional[discord.Attachment]) -> tuple[List[int], Optional[str]]:
+        """Collect user IDs from a role, a list of IDs / mentions and a CSV attachment"""
+        targets = {}
+        
+        if role:
+            for member in role.members:
+                if not member.bot:
+                    targets[member.id] = None
+        
+        if user_ids:
+            for match in USER_ID_PATTERN.findall(user_ids):
+                targets[int(match)] = None
+        
+        if csv_file:
+            if csv_file.size > BULK_MAX_CSV_SIZE:
+                return [], f"❌ **Error**: CSV file is larger than {BULK_MAX_CSV_SIZE // 1024}KB"
+            try:
+                text = (await csv_file.read()).decode('utf-8-sig')
+            except Exception as e:
+                return [], f"❌ **Error**: Could not read CSV file: {str(e)}"
+            # Take the first user ID in each row, header rows have none
+            for row in csv.reader(io.StringIO(text)):
+                for cell in row:
+                    if USER_ID_PATTERN.fullmatch(cell.strip()):
+                        targets[int(cell.strip())] = None
+                        break
+        
+        if not targets:
+            return [], "❌ **Error**: No users found. Give a role, user IDs or a CSV file of user IDs."
+        if len(targets) > BULK_MAX_TARGETS:
+            return [], f"❌ **Error**: {len(targets)} users given, the limit is {BULK_MAX_TARGETS}"
+        return list(targets), None
+    
+    async def _run_bulk(self, interaction: discord.Interaction, action: str, days: int,
+                        role: Optional[discord.Role], user_ids: Optional[str], csv_file: Optional[discord.Attachment]):
+        """Apply a grant / temp ban / temp access to many users in one write"""
+        if action != 'grant' and days <= 0:
+            await interaction.followup.send("❌ **Error**: Days must be positive", ephemeral=True)
+            return
+        
+        targets, error = await self._resolve_bulk_targets(role, user_ids, csv_file)
+        if error:
+            await interaction.followup.send(error, ephemeral=True)
+            return
+        
+        now = datetime.now()
+        expiry = now + timedelta(days=days)
+        all_tiers = list(self.files_by_tier.keys())
+        
+        # Only the fields the action sets are written, so pending bans / temp
+        # access (still tracked by the scheduler) and concurrent changes are kept
+        if action == 'grant':
+            fields = {
+                'email': 'admin_granted',
+                'tiers': all_tiers,
+                'verified_at': now.isoformat(),
+                'granted_by': interaction.user.id
+            }
+            defaults = None
+        elif action == 'tempban':
+            fields, defaults = {BAN: expiry.isoformat()}, {'email': 'unknown'}
+        else:
+            fields, defaults = {ACCESS: expiry.isoformat()}, {'email': 'temp_access'}
+        records = {str(user_id): fields for user_id in targets}
+        
+        # One batch, so the backend writes it in a single transaction / file rewrite
+        await self.state.update_users(records, defaults)
+        metrics.incr(f"bulk.{action}.users", len(records))
+        if action == 'grant':
+            mask = tier_catalog.mask_for(all_tiers)
+            self._tier_masks.update((user_id, mask) for user_id in targets)
+        if action == 'grant' and self.role_sync_enabled:
+            self.spawn(self._sync_roles({user_id: all_tiers for user_id in targets}))
+        
+        timestamp = int(expiry.timestamp())
+        notified = 0
+        for user_id in targets:
+            if action == 'tempban':
+                self.expiry_scheduler.schedule(BAN, user_id, expiry.timestamp())
+            elif action == 'tempaccess':
+                self.expiry_scheduler.schedule(ACCESS, user_id, expiry.timestamp())
+                self.dm_queue.put(
+                    user_id,
+                    f"🎉 **Temporary Access Granted!**\n\n"
+                    f"You have been given full access to all files for {days} days.\n"
+                    f"Expires: <t:{timestamp}:F>\n"
+                    f"Use `/files` in the server to see downloads!"
+                )
+                notified += 1
+            else:
+                self.dm_queue.put(
+                    user_id,
+                    f"🎉 **You've been granted full access!**\n\n"
+                    f"An administrator has given you access to all Patreon files.\n"
+                    f"Use `/setup` to download your files!"
+                )
+                notified += 1
+        
+        labels = {'grant': "Full Access Granted", 'tempban': "Users Temp-Banned", 'tempaccess': "Temp Access Granted"}
+        embed = discord.Embed(
+            title=f"✅ Bulk: {labels[action]}",
+            description=f"Applied to **{len(records)}** users",
+            color=discord.Color.red() if action == 'tempban' else discord.Color.green()
+        )
+        if action != 'grant':
+            embed.add_field(name="Expires", value=f"<t:{timestamp}:F> (<t:{timestamp}:R>)", inline=False)
+        if action != 'tempban':
+            embed.add_field(name="Notifications", value=f"{notified} DMs queued", inline=False)
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        
+        await self.log_action(
+            f"**Bulk: {labels[action]}**\n"
+            f"Users: {len(records)}\n"
+            f"By: {interaction.user.mention}" +
+            (f"\nDuration: {days} days" if action != 'grant' else ""),
+            interaction.user,
+            discord.Color.red() if action == 'tempban' else discord.Color.green()
+        )
+    
+    @app_commands.command(name="bulkgrant", description="[Admin] Grant full access to a role, a list of user IDs or a CSV of IDs")
     @app_commands.guild_only()
     @app_commands.default_permissions(administrator=True)
-    async def set_log_channel(self, interaction: discord.Interaction, channel: discord.TextChannel):
-        """Set the log channel"""
+    @deferred()
+    async def bulk_grant(self, interaction: discord.Interaction, role: Optional[discord.Role] = None,
+                         user_ids: Optional[str] = None, csv_file: Optional[discord.Attachment] = None):
+        """Grant full access to many users"""
+        await self._run_bulk(interaction, 'grant', 0, role, user_ids, csv_file)
+    
+    @app_commands.command(name="bulktempban", description="[Admin] Temporarily ban a role, a list of user IDs or a CSV of IDs")
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @deferred()
+    async def bulk_tempban(self, interaction: discord.Interaction, days: int, role: Optional[discord.Role] = None,
+                           user_ids: Optional[str] = None, csv_file: Optional[discord.Attachment] = None):
+        """Temp ban many users"""
+        await self._run_bulk(interaction, 'tempban', days, role, user_ids, csv_file)
+    
+    @app_commands.command(name="bulktempaccess", description="[Admin] Grant temporary full access to a role, a list of user IDs or a CSV of IDs")
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @deferred()
+    async def bulk_temp_access(self, interaction: discord.Interaction, days: int, role: Optional[discord.Role] = None,
+                               user_ids: Optional[str] = None, csv_file: Optional[discord.Attachment] = None):
+        """Grant temporary full access to many users"""
+        await self._run_bulk(interaction, 'tempaccess', days, role, user_ids, csv_file)
+
+    @app_commands.command(name="syncroles", description="[Admin] Create tier roles and sync them to every verified member")
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @deferred()
+    async def sync_roles(self, interaction: discord.Interaction):
+        """Mirror Patreon tiers into Discord roles"""
         try:
-            await interaction.response.defer(ephemeral=True)
-        except:
+            roles = await self.role_sync.ensure_roles(interaction.guild)
+        except discord.Forbidden:
+            await interaction.followup.send("❌ **Error**: I need the Manage Roles permission", ephemeral=True)
             return
         
+        users = await self.state.load_users()
+        tiers_by_user = {int(user_id): record.get('tiers', []) for user_id, record in users.items()}
+        await interaction.followup.send(
+            f"⏳ **Syncing roles**: {len(roles)} tier roles, {len(tiers_by_user)} records...",
+            ephemeral=True
+        )
+        
+        changed, failed = await self.role_sync.sync_all(interaction.guild, tiers_by_user)
+        
+        await interaction.followup.send(
+            f"✅ **Roles synced**: {changed} members updated, {failed} failed",
+            ephemeral=True
+        )
+        
+        await self.log_action(
+            f"**Tier Roles Synced**\n"
+            f"By: {interaction.user.mention}\n"
+            f"Members updated: {changed}\n"
+            f"Failed: {failed}",
+            interaction.user,
+            discord.Color.blue()
+        )
+    
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self.role_sync.invalidate(role.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self.role_sync.invalidate(role.guild.id)
+    
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name:
+            self.role_sync.invalidate(after.guild.id)
+
+    @app_commands.command(name="setlogchannel", description="[Admin] Set the logging channel")
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @deferred()
+    async def set_log_channel(self, interaction: discord.Interaction, channel: discord.TextChannel):
+        """Set the log channel"""
         self.log_channel_id = channel.id
-        self._save_config()
+        await self._save_config('log_channel_id')
         
         embed = discord.Embed(
             title="✅ Log Channel Set",
@@ -1332,17 +1778,132 @@ class PatreonCog(commands.Cog):
             discord.Color.blue()
         )
     
-    @app_commands.command(name="help", description="Show bot help and commands")
+    @app_commands.command(name="setstoragechannel", description="[Admin] Set the private channel used to store uploaded files")
     @app_commands.guild_only()
-    async def help_command(self, interaction: discord.Interaction):
-        """Show help information"""
-        try:
-            await interaction.response.defer(ephemeral=True)
-        except:
+    @app_commands.default_permissions(administrator=True)
+    @deferred()
+    async def set_storage_channel(self, interaction: discord.Interaction, channel: discord.TextChannel):
+        """Set the file storage channel"""
+        self.storage_channel_id = channel.id
+        await self._save_config('storage_channel_id')
+        
+        embed = discord.Embed(
+            title="✅ Storage Channel Set",
+            description=f"Files will be uploaded once to {channel.mention} and linked to users from there.\n"
+                        f"Keep this channel private.",
+            color=discord.Color.green()
+        )
+        
+        await interaction.followup.send(embed=embed, ephemeral=True)
+        
+        await self.log_action(
+            f"Storage channel set to {channel.mention} by {interaction.user.mention}",
+            interaction.user,
+            discord.Color.blue()
+        )
+    
+    @app_commands.command(name="metrics", description="[Admin] Show bot performance metrics")
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @deferred()
+    async def metrics_command(self, interaction: discord.Interaction):
+        """Show in-memory metrics"""
+        snapshot = metrics.snapshot()
+        
+        embed = discord.Embed(
+            title="📊 Bot Metrics",
+            description=f"Uptime: {int(snapshot['uptime'])}s",
+            color=discord.Color.blue()
+        )
+        
+        counters = "\n".join(f"`{name}`: {value}" for name, value in sorted(snapshot['counters'].items()))
+        embed.add_field(name="Counters", value=counters[:1024] or "None", inline=False)
+        
+        gauges = "\n".join(f"`{name}`: {value:g}" for name, value in sorted(snapshot['gauges'].items()))
+        embed.add_field(name="Gauges", value=gauges[:1024] or "None", inline=False)
+        
+        timings = "\n".join(
+            f"`{name}`: n={t['count']} p50={t['p50'] * 1000:.0f}ms p95={t['p95'] * 1000:.0f}ms p99={t['p99'] * 1000:.0f}ms"
+            for name, t in sorted(snapshot['timings'].items()) if t
+        )
+        embed.add_field(name="Timings", value=timings[:1024] or "None", inline=False)
+        
+        await interaction.followup.send(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="looplag", description="[Admin] Show event loop lag and what blocked it")
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @deferred()
+    async def loop_lag(self, interaction: discord.Interaction):
+        """Show event loop lag and recent stack samples"""
+        lag = metrics.percentiles("loop.lag")
+        monitor = self.loop_monitor
+        
+        embed = discord.Embed(
+            title="⏱️ Event Loop Lag",
+            description=f"Stalls over {monitor.threshold * 1000:.0f}ms: {metrics.counters.get('loop.stalls', 0)}",
+            color=discord.Color.orange() if monitor.stalls else discord.Color.green()
+        )
+        
+        if lag:
+            embed.add_field(
+                name="Lag",
+                value=f"p50={lag['p50'] * 1000:.1f}ms p95={lag['p95'] * 1000:.1f}ms p99={lag['p99'] * 1000:.1f}ms (n={lag['count']})",
+                inline=False
+            )
+        
+        # Newest first, the innermost frames show the blocking call
+        for stall in reversed(monitor.recent_stalls()[-3:]):
+            stack = stall['stack'][-900:]
+            embed.add_field(
+                name=f"Blocked {stall['blocked']:.2f}s • <t:{int(stall['at'])}:R>",
+                value=f"```{stack}```",
+                inline=False
+            )
+        
+        await interaction.followup.send(embed=embed, ephemeral=True)
+    
+    @app_commands.command(name="profile", description="[Admin] Sample the bot for a few seconds and post a flamegraph file")
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @deferred()
+    async def profile(self, interaction: discord.Interaction, seconds: int = 30, include_idle: bool = False):
+        """Run the sampling profiler and post collapsed stacks to the log channel"""
+        if seconds <= 0 or seconds > 120:
+            await interaction.followup.send("❌ **Error**: Seconds must be between 1 and 120", ephemeral=True)
             return
         
-        is_admin = interaction.user.guild_permissions.administrator if interaction.guild else False
+        if self.profiler.running:
+            await interaction.followup.send("⏳ **Already Profiling**: Wait for the current profile to finish.", ephemeral=True)
+            return
         
+        await interaction.followup.send(f"⏳ **Profiling** for {seconds}s...", ephemeral=True)
+        data = await self.profiler.profile(seconds, include_idle)
+        if data is None:
+            await interaction.followup.send("⏳ **Already Profiling**: Wait for the current profile to finish.", ephemeral=True)
+            return
+        
+        filename = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.collapsed"
+        summary = f"🔥 **Profile** ({seconds}s, {len(data.splitlines())} stacks) by {interaction.user.mention}\nOpen with speedscope or flamegraph.pl"
+        
+        channel = self.bot.get_channel(self.log_channel_id) if self.log_channel_id else None
+        if channel:
+            try:
+                await self.sender.submit(
+                    LOG, channel.send, summary,
+                    file=discord.File(io.BytesIO(data), filename=filename),
+                    route="log"
+                )
+                await interaction.followup.send(f"✅ **Profile posted** in {channel.mention}", ephemeral=True)
+                return
+            except discord.HTTPException as e:
+                print(f"[PROFILER] Could not post to log channel: {e}")
+        
+        # No usable log channel, hand the file to the admin directly
+        await interaction.followup.send(summary, file=discord.File(io.BytesIO(data), filename=filename), ephemeral=True)
+    
+    def _build_help_embed(self, is_admin: bool) -> discord.Embed:
+        """Build the /help embed"""
         embed = discord.Embed(
             title="📖 Patreon Bot Help",
             description="Here are all the available commands:",
@@ -1374,7 +1935,13 @@ class PatreonCog(commands.Cog):
                     "`/granttempaccess <user> <days>` - Grant temporary full access\n"
                     "`/tempban <user> <days>` - Temporarily ban a user\n"
                     "`/removetempban <user>` - Remove ban from a user\n"
-                    "`/setlogchannel <channel>` - Set bot logging channel"
+                    "`/bulkgrant`, `/bulktempaccess`, `/bulktempban` - Same for a role, user IDs or a CSV\n"
+                    "`/syncroles` - Create tier roles and sync them to members\n"
+                    "`/setlogchannel <channel>` - Set bot logging channel\n"
+                    "`/setstoragechannel <channel>` - Set private file storage channel\n"
+                    "`/metrics` - Show bot performance metrics\n"
+                    "`/looplag` - Show event loop lag and what blocked it\n"
+                    "`/profile [seconds]` - Profile the bot and post a flamegraph file"
                 ),
                 inline=False
             )
@@ -1397,6 +1964,15 @@ class PatreonCog(commands.Cog):
         )
         
         embed.set_footer(text="Need more help? Contact an administrator")
+        return embed
+    
+    @app_commands.command(name="help", description="Show bot help and commands")
+    @app_commands.guild_only()
+    @deferred()
+    async def help_command(self, interaction: discord.Interaction):
+        """Show help information"""
+        is_admin = interaction.user.guild_permissions.administrator if interaction.guild else False
+        embed = self.render_cache.get(('help', is_admin), lambda: self._build_help_embed(is_admin))
         
         await interaction.followup.send(embed=embed, ephemeral=True)
     
@@ -1404,20 +1980,18 @@ class PatreonCog(commands.Cog):
     @app_commands.guild_only()
     async def ping(self, interaction: discord.Interaction):
         """Ping command"""
-        await interaction.response.defer(ephemeral=True)
+        # Answered straight away, nothing to wait for
         latency = round(self.bot.latency * 1000)
-        await interaction.followup.send(f"🏓 Pong! {latency}ms", ephemeral=True)
+        await interaction.response.send_message(f"🏓 Pong! {latency}ms", ephemeral=True)
     
-    @app_commands.command(name="verify", description="Verify your Patreon subscription")
-    @app_commands.guild_only()
-    async def verify(self, interaction: discord.Interaction, email: str):
-        """Verify Patreon subscription"""
-        start_time = time.time()
+    async def verify_email(self, interaction: discord.Interaction, email: str, next_steps: str) -> Optional[List[str]]:
+        """Look up `email` and save the user's tiers, answering in the deferred response
         
-        try:
-            await interaction.response.defer(ephemeral=True)
-        except:
-            return
+        Returns the tiers, or None if verification failed and the user was told why.
+        """
+        # The member sweep can take a while on large campaigns
+        progress = Progress(interaction, self.sender)
+        await progress.update("🔎 Checking your Patreon membership...")
         
         try:
             tiers, error = await asyncio.wait_for(
@@ -1426,61 +2000,59 @@ class PatreonCog(commands.Cog):
             )
             
             if error:
-                await interaction.followup.send(error, ephemeral=True)
-                return
+                await progress.finish(error)
+                return None
             
             if not tiers:
-                await interaction.followup.send("❌ **No tiers found**", ephemeral=True)
-                return
+                await progress.finish("❌ **No tiers found**")
+                return None
             
+            # Pending ban / temp access expiries are kept
             user_data = {
                 'discord_id': interaction.user.id,
                 'email': email,
                 'tiers': tiers,
-                'verified_at': datetime.now().isoformat()
+                'verified_at': datetime.now().isoformat(),
+                'granted_by': None
             }
             
-            all_data = {}
-            if os.path.exists(self.user_data_file):
-                try:
-                    with open(self.user_data_file, 'r') as f:
-                        all_data = json.load(f)
-                except:
-                    pass
-            
-            # Preserve ban_expiry if exists
-            existing_user = all_data.get(str(interaction.user.id))
-            if existing_user and 'ban_expiry' in existing_user:
-                user_data['ban_expiry'] = existing_user['ban_expiry']
-
-            all_data[str(interaction.user.id)] = user_data
-            
-            with open(self.user_data_file, 'w') as f:
-                json.dump(all_data, f, indent=2)
-            
-            tier_list = "\n".join([f"• {tier}" for tier in sorted(set(tiers))])
-            
-            embed = discord.Embed(
-                title="✅ Verification Successful!",
-                description=f"Welcome, {interaction.user.mention}!",
-                color=discord.Color.green()
-            )
-            embed.add_field(name="Your Patreon Tiers", value=tier_list, inline=False)
-            embed.add_field(name="Next Steps", value="• Use `/files` to see downloads\n• Use `/download <name>` to get a file", inline=False)
-            
-            await interaction.followup.send(embed=embed, ephemeral=True)
+            await self.update_user_record(interaction.user.id, user_data)
             
         except asyncio.TimeoutError:
-            await interaction.followup.send("❌ **Timeout**: Please try again.", ephemeral=True)
+            await progress.finish("❌ **Timeout**: Please try again.")
+            return None
         except Exception as e:
-            await interaction.followup.send(f"❌ **Error**: {str(e)}", ephemeral=True)
+            await progress.finish(f"❌ **Error**: {str(e)}")
+            return None
+        
+        tier_list = "\n".join([f"• {tier}" for tier in sorted(set(tiers))])
+        
+        embed = discord.Embed(
+            title="✅ Verification Successful!",
+            description=f"Welcome, {interaction.user.mention}!",
+            color=discord.Color.green()
+        )
+        embed.add_field(name="Your Patreon Tiers", value=tier_list, inline=False)
+        embed.add_field(name="Next Steps", value=next_steps, inline=False)
+        
+        await progress.finish(None, embed=embed)
+        return tiers
+    
+    @app_commands.command(name="verify", description="Verify your Patreon subscription")
+    @app_commands.guild_only()
+    @deferred()
+    async def verify(self, interaction: discord.Interaction, email: str):
+        """Verify Patreon subscription"""
+        await self.verify_email(
+            interaction, email,
+            "• Use `/files` to see downloads\n• Use `/download <name>` to get a file"
+        )
     
     @app_commands.command(name="status", description="Check your account status")
     @app_commands.guild_only()
+    @deferred()
     async def status(self, interaction: discord.Interaction):
         """Check your account status"""
-        await interaction.response.defer(ephemeral=True)
-        
         # Check if banned
         ban_msg = self.check_ban_status(interaction.user.id)
         is_banned = ban_msg is not None
@@ -1489,15 +2061,7 @@ class PatreonCog(commands.Cog):
         temp_access, temp_expiry = self.check_temp_access(interaction.user.id)
         
         # Check user data
-        all_data = {}
-        if os.path.exists(self.user_data_file):
-            try:
-                with open(self.user_data_file, 'r') as f:
-                    all_data = json.load(f)
-            except:
-                pass
-        
-        user_data = all_data.get(str(interaction.user.id))
+        user_data = await self.get_user_record(interaction.user.id)
         is_verified = user_data is not None
         
         embed = discord.Embed(
@@ -1551,17 +2115,9 @@ class PatreonCog(commands.Cog):
     
     @app_commands.command(name="files", description="View your available files")
     @app_commands.guild_only()
+    @deferred()
     async def files(self, interaction: discord.Interaction):
         """Show available files"""
-        try:
-            await interaction.response.defer(ephemeral=True)
-        except discord.errors.NotFound:
-            print(f"[FILES] Interaction expired for {interaction.user.id}")
-            return
-        except Exception as e:
-            print(f"[FILES] Error deferring: {e}")
-            return
-        
         # Check ban status
         ban_msg = self.check_ban_status(interaction.user.id)
         if ban_msg:
@@ -1572,66 +2128,31 @@ class PatreonCog(commands.Cog):
         temp_access, temp_expiry = self.check_temp_access(interaction.user.id)
         
         if temp_access:
+            mask = None
             files = self.get_all_files()
             embed_footer = f"✅ Temporary Access (Expires <t:{int(temp_expiry.timestamp())}:R>)"
         else:
-            if not os.path.exists(self.user_data_file):
+            mask = await self.resolve_tier_mask(interaction.user)
+            if mask is None:
                 await interaction.followup.send("❌ **Not Verified**: Use `/verify <email>`", ephemeral=True)
                 return
             
-            try:
-                with open(self.user_data_file, 'r') as f:
-                    all_data = json.load(f)
-            except:
-                await interaction.followup.send("❌ **Error reading data**", ephemeral=True)
-                return
-            
-            user_data = all_data.get(str(interaction.user.id))
-            if not user_data:
-                await interaction.followup.send("❌ **Not Verified**: Use `/verify <email>`", ephemeral=True)
-                return
-            
-            tiers = user_data.get('tiers', [])
-            files = self.get_files_for_tiers(tiers)
+            files = self.get_files_for_mask(mask)
             embed_footer = "Use /download <filename> to download"
         
         if not files:
             await interaction.followup.send("❌ **No files available**", ephemeral=True)
             return
         
-        embed = discord.Embed(
-            title="📂 Your Available Files",
-            description=f"You have access to **{len(files)}** files",
-            color=discord.Color.blue()
-        )
-        
-        files_by_tier_display = {}
-        for file in files:
-            if file.tier not in files_by_tier_display:
-                files_by_tier_display[file.tier] = []
-            files_by_tier_display[file.tier].append(file.name)
-        
-        for tier, file_names in files_by_tier_display.items():
-            file_list = "\n".join([f"• {name}" for name in file_names])
-            embed.add_field(name=f"📁 {tier}", value=file_list, inline=False)
-        
-        embed.set_footer(text=embed_footer)
+        embed = self.get_files_embed('list', mask, files, embed_footer)
         
         await interaction.followup.send(embed=embed, ephemeral=True)
     
     @app_commands.command(name="download", description="Download a file")
     @app_commands.guild_only()
+    @deferred()
     async def download_cmd(self, interaction: discord.Interaction, file_name: str):
         """Download a file"""
-        try:
-            await interaction.response.defer(ephemeral=True)
-        except discord.errors.NotFound:
-            print(f"[DOWNLOAD] Interaction expired for {interaction.user.id}")
-            return
-        except Exception as e:
-            print(f"[DOWNLOAD] Error deferring: {e}")
-            return
-        
         # Check ban status
         ban_msg = self.check_ban_status(interaction.user.id)
         if ban_msg:
@@ -1645,19 +2166,12 @@ class PatreonCog(commands.Cog):
         if temp_access:
             files = self.get_all_files()
         else:
-            if not os.path.exists(self.user_data_file):
+            mask = await self.resolve_tier_mask(interaction.user)
+            if mask is None:
                 await interaction.followup.send("❌ **Not Verified**", ephemeral=True)
                 return
             
-            with open(self.user_data_file, 'r') as f:
-                all_data = json.load(f)
-            
-            user_data = all_data.get(str(interaction.user.id))
-            if not user_data:
-                await interaction.followup.send("❌ **Not Verified**", ephemeral=True)
-                return
-            
-            files = self.get_files_for_tiers(user_data.get('tiers', []))
+            files = self.get_files_for_mask(mask)
         
         target_file = None
         for file in files:
@@ -1666,35 +2180,57 @@ class PatreonCog(commands.Cog):
                 break
         
         if not target_file:
-            await interaction.followup.send(f"❌ **File '{file_name}' not found**", ephemeral=True)
+            suggestions = self.get_file_index(None if temp_access else mask).search(file_name, limit=1)
+            hint = f" Did you mean **{suggestions[0]}**?" if suggestions else ""
+            await interaction.followup.send(f"❌ **File '{file_name}' not found**.{hint}", ephemeral=True)
             return
         
         await interaction.followup.send(f"⏳ Downloading **{target_file.name}**...", ephemeral=True)
         
-        file_content = await self.download_file(target_file.link)
+        # Replies here can use the guild's boosted limit, or link a stored copy
+        upload_limit = self.get_upload_limit(interaction.guild)
+        cached, oversize = await self.download_file(target_file.link, self.get_delivery_limit(upload_limit))
+        
+        if oversize:
+            await interaction.edit_original_response(
+                content=f"❌ **File too large** ({oversize / (1024 * 1024):.2f}MB)\nDownload from: {target_file.link}"
+            )
+            return
         
-        if not file_content:
+        if not cached:
             await interaction.edit_original_response(content="❌ **Download failed**")
             return
         
-        filename = target_file.link.split('/')[-1]
-        file_size_mb = len(file_content) / (1024 * 1024)
+        # Link the stored copy when there is one instead of uploading again
+        url = await self.get_attachment_url(cached)
+        if url:
+            await self.sender.submit(
+                INTERACTION, interaction.edit_original_response,
+                content=f"✅ **{target_file.name}** ({cached.size_mb:.2f}MB)\n[Download {cached.filename}]({url})"
+            )
+            return
         
-        if file_size_mb > 25:
+        if cached.size > upload_limit:
             await interaction.edit_original_response(
-                content=f"❌ **File too large** ({file_size_mb:.2f}MB)\nDownload from: {target_file.link}"
+                content=f"❌ **File too large** ({cached.size_mb:.2f}MB)\nDownload from: {target_file.link}"
             )
             return
         
-        discord_file = discord.File(
-            fp=__import__('io').BytesIO(file_content),
-            filename=filename
-        )
+        discord_file = cached.to_discord_file()
         
-        await interaction.edit_original_response(
-            content=f"✅ **{target_file.name}** ({file_size_mb:.2f}MB)",
+        await self.sender.submit(
+            INTERACTION, interaction.edit_original_response,
+            content=f"✅ **{target_file.name}** ({cached.size_mb:.2f}MB)",
             attachments=[discord_file]
         )
+    
+    @download_cmd.autocomplete('file_name')
+    async def download_file_name_autocomplete(self, interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+        """Suggest file names the user can download, from memory only"""
+        started = time.monotonic()
+        names = self.get_file_index(self.cached_tier_mask(interaction.user)).search(current)
+        metrics.observe("autocomplete.time", time.monotonic() - started)
+        return [app_commands.Choice(name=name, value=name) for name in names]
 
 async def setup(bot):
     await bot.add_cog(PatreonCog(bot))
\ No newline at end of file
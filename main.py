@@ -1,23 +1,35 @@
 import discord
 from discord.ext import commands
 from dotenv import load_dotenv
-import os, requests, csv, time
-from cogs.Patreon import PatreonCog
 
-# Load environment variables
+# Load environment variables, before the modules below read them at import
 load_dotenv()
 
+import os, requests, csv, time, io
+from cogs.Patreon import PatreonCog
+from utils.storage import storage, atomic_write
+from utils.metrics import metrics
+from utils.interactions import RESPONSE_WINDOW
+from utils.runtime import install_event_loop
+from utils.codec import codec
+
 # Globals
 CSV_FILE = 'user_data.csv'
 
+# Sharding: set BOT_SHARDED=true to run an AutoShardedBot. To split shards
+# across processes give each one SHARD_COUNT and its own SHARD_IDS (e.g. "0,1")
+# and point them all at a shared STATE_BACKEND such as sqlite:bot_state.db
+SHARDED = os.getenv('BOT_SHARDED', '').lower() in ('1', 'true', 'yes')
+SHARD_COUNT = int(os.getenv('SHARD_COUNT')) if os.getenv('SHARD_COUNT') else None
+SHARD_IDS = [int(i) for i in os.getenv('SHARD_IDS').split(',')] if os.getenv('SHARD_IDS') else None
+
 
 # Functions
-def get_file_text_as_file():
+def get_file_text_as_file(file_path="trial_profiles.lua"):
     URL = "https://gitfront.io/r/Spiken/iHrJpBGcbT3p/trials/raw/trial.lua"
-    response = requests.get(URL)
+    response = requests.get(URL, timeout=15)
 
     # Write the content to a file in binary mode
-    file_path = "trial_profiles.lua"
     with open(file_path, "wb") as file:
         file.write(response.content)
     return file_path
@@ -30,11 +42,12 @@ def read_csv():
         return list(reader)
 
 def write_csv(data):
-    with open(CSV_FILE, mode='w', newline='') as file:
-        fieldnames = ['userid', 'username', 'timestamp']
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
+    buffer = io.StringIO(newline='')
+    fieldnames = ['userid', 'username', 'timestamp']
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    writer.writeheader()
+    writer.writerows(data)
+    atomic_write(CSV_FILE, buffer.getvalue().encode())
 
 def update_user_data(userid, username):
     data = read_csv()
@@ -58,16 +71,21 @@ def update_user_data(userid, username):
     
     
 
-class PatreonBot(commands.Bot):
+class PatreonBot(commands.AutoShardedBot if SHARDED else commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
         intents.message_content = True
         intents.members = True
         
+        shard_options = {}
+        if SHARDED:
+            shard_options = {'shard_count': SHARD_COUNT, 'shard_ids': SHARD_IDS}
+        
         super().__init__(
             command_prefix='!',
             intents=intents,
-            help_command=None
+            help_command=None,
+            **shard_options
         )
         
         self._cog_loaded = False
@@ -83,12 +101,16 @@ class PatreonBot(commands.Bot):
         self._cog_loaded = True
         print("PatreonCog loaded!")
         
-        print("Syncing slash commands...")
-        try:
-            synced = await self.tree.sync()
-            print(f"Synced {len(synced)} command(s)")
-        except Exception as e:
-            print(f"Failed to sync commands: {e}")
+        # Commands are global, only one process of a shard cluster syncs them
+        if SHARD_IDS and 0 not in SHARD_IDS:
+            print("Skipping slash command sync (not running shard 0)")
+        else:
+            print("Syncing slash commands...")
+            try:
+                synced = await self.tree.sync()
+                print(f"Synced {len(synced)} command(s)")
+            except Exception as e:
+                print(f"Failed to sync commands: {e}")
         
         print("="*60)
         print("BOT SETUP COMPLETE")
@@ -112,6 +134,11 @@ class PatreonBot(commands.Bot):
         print(f"Received at (UTC): {now}")
         print(f"Age when received: {age:.3f}s")
         
+        metrics.incr("interactions.received")
+        metrics.observe("interactions.receive_age", age)
+        if age > RESPONSE_WINDOW:
+            metrics.incr("interactions.expired_on_arrival")
+        
         if age > 2.5:
             print(f"⚠️ WARNING: Interaction is ALREADY {age:.3f}s old when received!")
             print(f"   This will likely timeout. Check your network/gateway connection.")
@@ -128,6 +155,8 @@ class PatreonBot(commands.Bot):
         print(f'{"="*60}')
         print(f'Logged in as: {self.user} (ID: {self.user.id})')
         print(f'Connected to: {len(self.guilds)} guild(s)')
+        if SHARDED:
+            print(f'Shards: {sorted(self.shards)} of {self.shard_count}')
         print(f'Gateway latency: {round(self.latency * 1000)}ms')
         print(f'Cog loaded: {self._cog_loaded}')
         
@@ -143,6 +172,12 @@ class PatreonBot(commands.Bot):
         print(f'{"="*60}\n')
         print("Bot is ready! Waiting for commands...")
     
+    async def close(self):
+        """Let queued file writes land before shutting down"""
+        await super().close()
+        await storage.close()
+        print("Storage flushed")
+
     async def on_command_error(self, ctx, error):
         """Handle command errors"""
         print(f"Command error: {error}")
@@ -189,17 +224,21 @@ def main():
         async def on_button_click(self, interaction: discord.Interaction, button: discord.ui.Button):
             await interaction.response.defer()
             user = interaction.user
-            is_timestamp = update_user_data(user.id, user.name)
+            # CSV read-modify-write runs off the event loop, one click at a time
+            is_timestamp = await storage.serialized(CSV_FILE, update_user_data, user.id, user.name)
             if not is_timestamp:
+                file_path = None
                 try:
-                    file_path = get_file_text_as_file()
-                    await user.send("Here is your trial content:", file=discord.File(file_path))
+                    # requests is blocking, download in the storage thread pool. Each
+                    # click gets its own file since downloads can now overlap
+                    file_path = await storage.run(get_file_text_as_file, f"trial_profiles_{user.id}.lua")
+                    await user.send("Here is your trial content:", file=discord.File(file_path, filename="trial_profiles.lua"))
                     await interaction.followup.send('You have been given a trial period! Check your DMs.', ephemeral=True)
                 except discord.Forbidden:
                     await interaction.followup.send('Please enable your DMs to receive trial install file.', ephemeral=True)
                 finally:
                     # Clean up the file after sending
-                    if os.path.exists(file_path):
+                    if file_path and os.path.exists(file_path):
                         os.remove(file_path)
             else:
                 await interaction.followup.send(f'Not Eligible for trial right now! Request Again In <t:{is_timestamp}:R>', ephemeral=True)
@@ -209,6 +248,9 @@ def main():
     if not token:
         raise ValueError("DISCORD_TOKEN not found in .env file")
     
+    # PERF_RUNTIME swaps in uvloop, must happen before the first asyncio.run
+    print(f"Runtime: {install_event_loop()} event loop, {codec.name} JSON codec")
+    
     # Check Discord API connectivity before starting
     print("Testing Discord API connectivity...")
     import aiohttp
@@ -0,0 +1,43 @@
+import time
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+
+def url_expires_at(url: str) -> Optional[float]:
+    """Expiry of a signed Discord CDN URL, from its hex `ex` parameter"""
+    ex = parse_qs(urlparse(url).query).get('ex')
+    if not ex:
+        return None
+    try:
+        return float(int(ex[0], 16))
+    except ValueError:
+        return None
+
+
+class AttachmentStore:
+    """Remembers which storage channel message holds each file version"""
+    namespace = 'attachments'
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    async def get(self, digest: str) -> Optional[dict]:
+        return await self.backend.get_value(self.namespace, digest)
+
+    async def put(self, digest: str, channel_id: int, message_id: int, url: str, filename: str):
+        await self.backend.set_value(self.namespace, digest, {
+            'channel_id': channel_id,
+            'message_id': message_id,
+            'url': url,
+            'filename': filename,
+            'uploaded_at': time.time()
+        })
+
+    async def update_url(self, digest: str, url: str):
+        entry = await self.get(digest)
+        if entry:
+            entry['url'] = url
+            await self.backend.set_value(self.namespace, digest, entry)
+
+    async def forget(self, digest: str):
+        await self.backend.delete_value(self.namespace, digest)
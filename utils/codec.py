@@ -0,0 +1,62 @@
+import json
+import os
+from typing import Any, Union
+
+from utils.runtime import PERF_RUNTIME
+
+
+class StdlibCodec:
+    """JSON through the standard library"""
+    name = 'json'
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj)
+
+    def encode(self, obj: Any, indent: bool = False) -> bytes:
+        return json.dumps(obj, indent=2 if indent else None).encode()
+
+
+class OrjsonCodec:
+    """JSON through orjson, several times faster on large documents"""
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        # Integer keys are written as strings, like the json module does
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._orjson.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return self._orjson.dumps(obj, option=self._options).decode()
+
+    def encode(self, obj: Any, indent: bool = False) -> bytes:
+        options = (self._options | self._orjson.OPT_INDENT_2) if indent else self._options
+        return self._orjson.dumps(obj, option=options)
+
+
+CODECS = {'json': StdlibCodec, 'orjson': OrjsonCodec}
+
+
+def create_codec(name: str = None):
+    """Codec named by JSON_CODEC, orjson by default under PERF_RUNTIME
+
+    Falls back to the standard library when the codec is not installed.
+    """
+    name = name or os.getenv('JSON_CODEC') or ('orjson' if PERF_RUNTIME else 'json')
+    if name not in CODECS:
+        raise ValueError(f"Unknown JSON_CODEC '{name}'")
+    try:
+        return CODECS[name]()
+    except ImportError:
+        print(f"[CODEC] {name} is not installed, using json")
+        return StdlibCodec()
+
+
+# Used for Patreon responses, the user store and config
+codec = create_codec()
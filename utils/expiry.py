@@ -0,0 +1,116 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+# Kinds of expiring records tracked by the scheduler
+BAN = 'ban_expiry'
+ACCESS = 'access_expiry'
+
+
+class ExpiryScheduler:
+    """Fires a callback at the exact expiry time of temp bans / temp access
+
+    The callback gets (kind, user_id, expires_at), so it can check the
+    stored expiry is still the one that was scheduled. Each call runs as
+    its own task, cancelled after `timeout` seconds, so a slow storage
+    write or DM never holds up the expiries due after it.
+    """
+    def __init__(self, on_expire: Callable[[str, int, float], Awaitable[None]], timeout: float = 60.0):
+        self.on_expire = on_expire
+        self.timeout = timeout
+        self._heap: List[Tuple[float, str, int]] = []
+        self._expiries: Dict[Tuple[str, int], float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._handlers: Set[asyncio.Task] = set()
+
+    def schedule(self, kind: str, user_id: int, expires_at: float):
+        """Schedule (or reschedule) an expiry as a unix timestamp"""
+        self._expiries[(kind, user_id)] = expires_at
+        heapq.heappush(self._heap, (expires_at, kind, user_id))
+        self._wakeup.set()
+
+    def cancel(self, kind: str, user_id: int):
+        """Cancel a pending expiry, stale heap entries are skipped when popped"""
+        self._expiries.pop((kind, user_id), None)
+
+    def get(self, kind: str, user_id: int) -> Optional[float]:
+        """Return the expiry timestamp if it is still in the future"""
+        expires_at = self._expiries.get((kind, user_id))
+        if expires_at is None or expires_at <= time.time():
+            return None
+        return expires_at
+
+    def load(self, all_data: dict):
+        """Replace pending expiries with the ban/access expiries found in the user data"""
+        wanted = {}
+        for user_id_str, user_data in all_data.items():
+            for kind in (BAN, ACCESS):
+                value = user_data.get(kind)
+                if not value:
+                    continue
+                try:
+                    wanted[(kind, int(user_id_str))] = _parse_iso(value)
+                except ValueError:
+                    continue
+
+        for key in list(self._expiries):
+            if key not in wanted:
+                del self._expiries[key]
+        for (kind, user_id), expires_at in wanted.items():
+            if self._expiries.get((kind, user_id)) != expires_at:
+                self.schedule(kind, user_id, expires_at)
+
+    def __len__(self):
+        return len(self._expiries)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        for handler in self._handlers:
+            handler.cancel()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            expires_at, kind, user_id = self._heap[0]
+            delay = expires_at - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            # Skip entries that were cancelled or rescheduled since being pushed
+            if self._expiries.get((kind, user_id)) != expires_at:
+                continue
+            del self._expiries[(kind, user_id)]
+
+            handler = asyncio.create_task(self._handle(kind, user_id, expires_at))
+            self._handlers.add(handler)
+            handler.add_done_callback(self._handlers.discard)
+
+    async def _handle(self, kind: str, user_id: int, expires_at: float):
+        try:
+            await asyncio.wait_for(self.on_expire(kind, user_id, expires_at), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            print(f"[EXPIRY] Handling {kind} for {user_id} timed out after {self.timeout:g}s")
+        except Exception as e:
+            print(f"[EXPIRY] Error handling {kind} for {user_id}: {e}")
+
+
+def _parse_iso(value: str) -> float:
+    return datetime.fromisoformat(value).timestamp()
@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import itertools
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+import aiohttp
+import discord
+
+from utils.metrics import metrics
+from utils.storage import storage
+
+
+def _write_chunks(f, sha1, chunks: list):
+    for chunk in chunks:
+        sha1.update(chunk)
+        f.write(chunk)
+
+
+def _hash_file(path: str, chunk_size: int) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _replace(src: str, dst: str) -> os.stat_result:
+    os.replace(src, dst)
+    return os.stat(dst)
+
+
+class FileTooLarge(Exception):
+    """Raised when a remote file is larger than the allowed upload size"""
+    def __init__(self, size: int):
+        super().__init__(f"File is {size} bytes")
+        self.size = size
+
+
+def _check_size(cached: 'CachedFile', max_size: Optional[int]) -> 'CachedFile':
+    if max_size is not None and cached.size > max_size:
+        raise FileTooLarge(cached.size)
+    return cached
+
+
+class CachedFile:
+    """A downloaded file on disk, size is known from metadata without reading it"""
+    __slots__ = ('path', 'filename', 'size', 'digest')
+
+    def __init__(self, path: str, filename: str, size: int, digest: str):
+        self.path = path
+        self.filename = filename
+        self.size = size
+        self.digest = digest
+
+    @property
+    def size_mb(self) -> float:
+        return self.size / (1024 * 1024)
+
+    def to_discord_file(self) -> discord.File:
+        """discord.File streams from the file handle during upload"""
+        return discord.File(self.path, filename=self.filename)
+
+
+class FileCache:
+    """On-disk cache of remote files keyed by URL
+
+    Downloads stream through a buffer of at most `buffer_chunks` chunks
+    that a writer drains to disk in the storage thread pool. When the disk
+    falls behind the buffer fills and reading from the socket pauses, so
+    memory per download stays constant whatever the file size.
+    """
+    def __init__(self, directory: str = 'file_cache', ttl: float = 600, chunk_size: int = 64 * 1024, buffer_chunks: int = 8):
+        self.directory = directory
+        self.ttl = ttl
+        self.chunk_size = chunk_size
+        self.buffer_chunks = buffer_chunks
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._inflight: Dict[Tuple[str, Optional[int]], asyncio.Future] = {}
+        self._tmp_ids = itertools.count()
+        self._digests: Dict[str, Tuple[float, str]] = {}
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path_for(self, url: str) -> str:
+        digest = hashlib.sha1(url.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, f"{digest}_{url.split('/')[-1]}")
+
+    async def lookup(self, url: str) -> Optional[CachedFile]:
+        """Return the cached file if it exists and is fresh"""
+        path = self.path_for(url)
+        stat = await storage.run(_stat, path)
+        if stat is None or time.time() - stat.st_mtime > self.ttl:
+            return None
+        return CachedFile(path, url.split('/')[-1], stat.st_size, await self._digest_for(path, stat.st_mtime))
+
+    async def _digest_for(self, path: str, mtime: float) -> str:
+        """Content hash identifying a file version, computed once per cache write"""
+        known = self._digests.get(path)
+        if known and known[0] == mtime:
+            return known[1]
+        # Only files cached before a restart get here, they are hashed off the loop
+        digest = await storage.run(_hash_file, path, self.chunk_size)
+        self._digests[path] = (mtime, digest)
+        return digest
+
+    async def fetch(self, url: str, max_size: Optional[int] = None) -> Optional[CachedFile]:
+        """Get a file from the cache, downloading it once if missing or stale
+
+        Raises FileTooLarge without reading the body when the response
+        announces more than `max_size` bytes.
+        """
+        cached = await self.lookup(url)
+        if cached:
+            metrics.incr("filecache.hit")
+            return _check_size(cached, max_size)
+
+        # Concurrent requests for the same URL and limit share a single download
+        key = (url, max_size)
+        while key in self._inflight:
+            metrics.incr("filecache.coalesced")
+            future = self._inflight[key]
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The download we joined was cancelled, not us, so start another
+
+        metrics.incr("filecache.miss")
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._download(url, max_size)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            # Cancelled downloads must not leave coalesced callers waiting forever
+            if not future.done():
+                future.cancel()
+            del self._inflight[key]
+
+    async def _download(self, url: str, max_size: Optional[int]) -> Optional[CachedFile]:
+        path = self.path_for(url)
+        tmp_path = f"{path}.{os.getpid()}.{next(self._tmp_ids)}.tmp"
+        session = self._get_session()
+
+        started = time.monotonic()
+        async with session.get(url) as response:
+            if response.status != 200:
+                return None
+            size = response.content_length
+            if size is not None and max_size is not None and size > max_size:
+                raise FileTooLarge(size)
+
+            buffer: asyncio.Queue = asyncio.Queue(maxsize=self.buffer_chunks)
+            writer = asyncio.create_task(self._write_chunks(tmp_path, buffer))
+            try:
+                received = 0
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    # Servers without a Content-Length are cut off as soon as they go over
+                    received += len(chunk)
+                    if max_size is not None and received > max_size:
+                        raise FileTooLarge(received)
+                    if buffer.full():
+                        metrics.incr("filecache.backpressure")
+                    await buffer.put(chunk)
+                await buffer.put(None)
+                digest = await writer
+            except BaseException:
+                # The writer is not cancelled mid-write: it finishes what is
+                # buffered and closes the file before the tmp file is removed
+                try:
+                    if not writer.done():
+                        await buffer.put(None)
+                    await asyncio.gather(writer, return_exceptions=True)
+                finally:
+                    writer.cancel()
+                await storage.run(_remove, tmp_path)
+                raise
+
+        stat = await storage.run(_replace, tmp_path, path)
+        self._digests[path] = (stat.st_mtime, digest)
+        metrics.observe("filecache.download", time.monotonic() - started)
+        return CachedFile(path, url.split('/')[-1], stat.st_size, digest)
+
+    async def _write_chunks(self, path: str, buffer: asyncio.Queue) -> str:
+        """Drain `buffer` into `path` off the event loop until None, returns the sha1"""
+        sha1 = hashlib.sha1()
+        f = None
+        error = None
+        done = False
+        try:
+            while not done:
+                # Everything already buffered goes to disk in one thread hop
+                chunks = [await buffer.get()]
+                while not buffer.empty():
+                    chunks.append(buffer.get_nowait())
+                if chunks[-1] is None:
+                    chunks.pop()
+                    done = True
+                if error is not None:
+                    # Keep draining after an error so the reader never waits on a full buffer
+                    continue
+                try:
+                    if f is None:
+                        f = await storage.run(open, path, 'wb')
+                    await storage.run(_write_chunks, f, sha1, chunks)
+                except Exception as e:
+                    error = e
+        finally:
+            if f is not None:
+                await storage.run(f.close)
+        if error is not None:
+            raise error
+        return sha1.hexdigest()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
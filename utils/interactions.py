@@ -0,0 +1,123 @@
+import functools
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import discord
+
+from utils.metrics import metrics
+from utils.sender import SendScheduler, INTERACTION, DM
+
+# Discord gives 3s for the first response and 15 minutes for followups
+RESPONSE_WINDOW = 3.0
+TOKEN_WINDOW = 15 * 60
+
+
+def interaction_age(interaction: discord.Interaction) -> float:
+    return (datetime.now(timezone.utc) - interaction.created_at).total_seconds()
+
+
+def response_remaining(interaction: discord.Interaction) -> float:
+    """Seconds left to send the first response"""
+    return RESPONSE_WINDOW - interaction_age(interaction)
+
+
+def token_remaining(interaction: discord.Interaction) -> float:
+    """Seconds left to send followups / edit the original response"""
+    return TOKEN_WINDOW - interaction_age(interaction)
+
+
+async def acknowledge(interaction: discord.Interaction, ephemeral: bool = True, thinking: bool = False) -> bool:
+    """Defer an interaction right away, False if it already expired"""
+    if interaction.response.is_done():
+        return True
+
+    age = interaction_age(interaction)
+    metrics.observe("interactions.ack_age", age)
+    try:
+        await interaction.response.defer(ephemeral=ephemeral, thinking=thinking)
+    except discord.NotFound:
+        metrics.incr("interactions.expired")
+        print(f"[INTERACTION] Expired before it was acknowledged ({age:.2f}s old)")
+        return False
+    except discord.HTTPException as e:
+        # 40060: already acknowledged elsewhere
+        if e.code == 40060:
+            return True
+        metrics.incr("interactions.ack_failed")
+        print(f"[INTERACTION] Could not acknowledge: {e}")
+        return False
+
+    metrics.incr("interactions.acked")
+    if age > RESPONSE_WINDOW / 2:
+        metrics.incr("interactions.acked_late")
+    return True
+
+
+def deferred(ephemeral: bool = True, thinking: bool = False):
+    """Decorator that acknowledges `callback(self, interaction, ...)` before running it"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
+            if not await acknowledge(interaction, ephemeral=ephemeral, thinking=thinking):
+                return
+            return await func(self, interaction, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Progress:
+    """Progress reporting for work that outlives the first response
+
+    Updates edit the original response, at most once every `min_interval`
+    seconds. Once the interaction token is about to run out, updates stop
+    and the final message goes to the user's DMs instead.
+    """
+    def __init__(self, interaction: discord.Interaction, sender: Optional[SendScheduler] = None,
+                 min_interval: float = 1.5, token_margin: float = 30.0):
+        self.interaction = interaction
+        self.sender = sender
+        self.min_interval = min_interval
+        self.token_margin = token_margin
+        self._last_update = 0.0
+
+    @property
+    def token_valid(self) -> bool:
+        return token_remaining(self.interaction) > self.token_margin
+
+    async def _edit(self, **kwargs):
+        if self.sender is not None:
+            await self.sender.submit(INTERACTION, self.interaction.edit_original_response, **kwargs)
+        else:
+            await self.interaction.edit_original_response(**kwargs)
+
+    async def update(self, content: str):
+        """Show progress, skipped when throttled or the token is running out"""
+        now = time.monotonic()
+        if now - self._last_update < self.min_interval or not self.token_valid:
+            return
+        self._last_update = now
+        try:
+            await self._edit(content=content)
+        except discord.HTTPException:
+            pass
+
+    async def finish(self, content: str, **kwargs):
+        """Final message, sent by DM if the interaction token expired"""
+        if self.token_valid:
+            try:
+                await self._edit(content=content, **kwargs)
+                return
+            except discord.NotFound:
+                pass
+
+        metrics.incr("interactions.token_expired")
+        user = self.interaction.user
+        try:
+            dm = await user.create_dm()
+            if self.sender is not None:
+                await self.sender.submit(DM, dm.send, content, route=f"dm:{user.id}", **kwargs)
+            else:
+                await dm.send(content, **kwargs)
+        except discord.HTTPException:
+            pass
@@ -0,0 +1,83 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import List, Optional
+
+from utils.metrics import metrics
+
+
+class LoopMonitor:
+    """Measures event loop scheduling delay and catches what blocks it
+
+    A task sleeps `interval` seconds at a time and records how late it woke
+    up as `loop.lag`. A watchdog thread watches the task's heartbeat, and
+    once the loop has been stuck for `threshold` seconds it samples the loop
+    thread's stack, which shows the blocking call while it is still running.
+    """
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25, max_stalls: int = 20, stack_depth: int = 12):
+        self.interval = interval
+        self.threshold = threshold
+        self.stack_depth = stack_depth
+        # Most recent stalls: {'at', 'blocked', 'stack'}, 'blocked' is final once the loop resumes
+        self.stalls: deque = deque(maxlen=max_stalls)
+        self._heartbeat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+        self._thread = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._stopped.set()
+
+    def recent_stalls(self) -> List[dict]:
+        return list(self.stalls)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            heartbeat = self._heartbeat = time.monotonic()
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            metrics.observe("loop.lag", lag)
+            metrics.set_gauge("loop.lag_ms", round(lag * 1000, 1))
+
+            # The watchdog saw this stall while it was going on, record how long it lasted
+            if self.stalls and self.stalls[-1]['heartbeat'] == heartbeat:
+                self.stalls[-1]['blocked'] = lag
+                print(f"[LOOP] Event loop was blocked for {lag:.2f}s")
+
+    def _watch(self):
+        sampled = None
+        while not self._stopped.wait(self.interval):
+            heartbeat = self._heartbeat
+            blocked = time.monotonic() - heartbeat - self.interval
+            if blocked < self.threshold or heartbeat == sampled:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            sampled = heartbeat
+            stack = "".join(traceback.format_stack(frame, limit=self.stack_depth))
+            del frame
+
+            metrics.incr("loop.stalls")
+            self.stalls.append({'at': time.time(), 'blocked': blocked, 'stack': stack, 'heartbeat': heartbeat})
+            print(f"[LOOP] Event loop blocked for {blocked:.2f}s so far, stack:\n{stack}")
@@ -0,0 +1,42 @@
+import time
+from collections import defaultdict, deque
+from typing import Dict
+
+
+class Metrics:
+    """In-memory counters, gauges and timings for the bot"""
+    def __init__(self, max_samples: int = 1000):
+        self.started_at = time.time()
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.gauges: Dict[str, float] = {}
+        self.timings: Dict[str, deque] = defaultdict(lambda: deque(maxlen=max_samples))
+
+    def incr(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        self.timings[name].append(seconds)
+
+    def percentiles(self, name: str) -> Dict[str, float]:
+        """p50/p95/p99 of recent samples, in seconds"""
+        samples = sorted(self.timings.get(name, ()))
+        if not samples:
+            return {}
+        def pick(q):
+            return samples[min(len(samples) - 1, int(q * len(samples)))]
+        return {'count': len(samples), 'p50': pick(0.50), 'p95': pick(0.95), 'p99': pick(0.99)}
+
+    def snapshot(self) -> dict:
+        return {
+            'uptime': time.time() - self.started_at,
+            'counters': dict(self.counters),
+            'gauges': dict(self.gauges),
+            'timings': {name: self.percentiles(name) for name in self.timings},
+        }
+
+
+# Shared registry used across the bot
+metrics = Metrics()
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Optional
+
+import discord
+
+from utils.metrics import metrics
+from utils.sender import SendScheduler, DM
+
+
+class DMQueue:
+    """Background queue that DMs users at a steady pace
+
+    Bulk operations can notify hundreds of users. Queued DMs are sent at
+    most `rate` per second through the send scheduler's DM lane, so they
+    never crowd out interaction responses or trip Discord's DM spam checks.
+    """
+    def __init__(self, bot: discord.Client, sender: SendScheduler, rate: float = 1.0):
+        self.bot = bot
+        self.sender = sender
+        self.interval = 1 / rate
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def put(self, user_id: int, content: str):
+        self._queue.put_nowait((user_id, content))
+        metrics.incr("notify.queued")
+        metrics.set_gauge("notify.queue_depth", self._queue.qsize())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            user_id, content = await self._queue.get()
+            metrics.set_gauge("notify.queue_depth", self._queue.qsize())
+            try:
+                user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
+                dm = await user.create_dm()
+                await self.sender.submit(DM, dm.send, content, route=f"dm:{user_id}")
+                metrics.incr("notify.sent")
+            except Exception as e:
+                # Closed DMs and unknown users are expected in a large cohort
+                print(f"[NOTIFY] Could not DM {user_id}: {type(e).__name__}")
+                metrics.incr("notify.failed")
+            await asyncio.sleep(self.interval)
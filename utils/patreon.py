@@ -0,0 +1,117 @@
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from utils.codec import codec
+from utils.metrics import metrics
+
+# Member attributes each use case reads, nothing else is requested. Tiers
+# are included as bare ids, their titles come from the campaign catalog
+PROJECTIONS = {
+    'verify': ('email', 'patron_status'),
+}
+
+
+def member_params(projection: str, page_size: int = 100, cursor: Optional[str] = None) -> Dict[str, str]:
+    """Query string for one page of campaign members"""
+    params = {
+        'include': 'currently_entitled_tiers',
+        'fields[member]': ",".join(PROJECTIONS[projection]),
+        'page[count]': str(page_size),
+    }
+    if cursor:
+        params['page[cursor]'] = cursor
+    return params
+
+
+def member_tier_ids(member: dict) -> List[str]:
+    tiers = member.get('relationships', {}).get('currently_entitled_tiers', {}).get('data', [])
+    return [tier['id'] for tier in tiers if tier.get('id')]
+
+
+class CampaignTiers:
+    """Tier id -> title map of the campaign, with when it was fetched"""
+    def __init__(self):
+        self.titles: Dict[str, str] = {}
+        self.fetched_at: Optional[float] = None
+
+    def __len__(self):
+        return len(self.titles)
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at if self.fetched_at else float('inf')
+
+    def missing(self, tier_ids: Iterable[str]) -> List[str]:
+        return [tier_id for tier_id in tier_ids if tier_id not in self.titles]
+
+    def titles_for(self, tier_ids: Iterable[str]) -> List[str]:
+        """Titles of the known tiers, in order and without duplicates"""
+        titles = []
+        for tier_id in tier_ids:
+            title = self.titles.get(tier_id)
+            if title and title not in titles:
+                titles.append(title)
+        return titles
+
+    def update(self, titles: Dict[str, str], fetched_at: Optional[float] = None):
+        self.titles = dict(titles)
+        self.fetched_at = fetched_at or time.time()
+
+
+async def fetch_campaign(api_base: str, token: str, campaign_id: Optional[str] = None,
+                         attempts: int = 3, backoff: float = 5.0) -> Tuple[Optional[dict], Optional[str]]:
+    """Campaign id, name and tier catalog, {'id', 'name', 'tiers'}
+
+    Without `campaign_id` the token's first campaign is used. Timeouts, 429s
+    and server errors are retried with exponential backoff.
+    """
+    error = None
+    timeout = aiohttp.ClientTimeout(total=10)
+    async with aiohttp.ClientSession(timeout=timeout) as session:
+        for attempt in range(attempts):
+            try:
+                campaign, error, retryable = await _fetch_campaign_once(session, api_base, token, campaign_id)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                campaign, error, retryable = None, f"❌ **Error**: {type(e).__name__}", True
+            if campaign or not retryable:
+                return campaign, error
+
+            metrics.incr("patreon.campaign_retries")
+            if attempt + 1 < attempts:
+                delay = backoff * 2 ** attempt
+                print(f"[PATREON] Campaign fetch failed ({error}), retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+    return None, error
+
+
+async def _fetch_campaign_once(session: aiohttp.ClientSession, api_base: str, token: str,
+                               campaign_id: Optional[str]) -> Tuple[Optional[dict], Optional[str], bool]:
+    """One request, returns (campaign, error, retryable)"""
+    url = f"{api_base}/campaigns/{campaign_id}" if campaign_id else f"{api_base}/campaigns"
+    params = {'include': 'tiers', 'fields[campaign]': 'creation_name', 'fields[tier]': 'title'}
+    headers = {'Authorization': f'Bearer {token}'}
+    async with session.get(url, headers=headers, params=params) as response:
+        if response.status == 401:
+            return None, "❌ **Authentication Error**: Invalid access token.", False
+        if response.status != 200:
+            return None, f"❌ **API Error**: Status {response.status}", response.status == 429 or response.status >= 500
+        data = await response.json(loads=codec.loads)
+
+    campaigns = data.get('data', [])
+    if isinstance(campaigns, dict):
+        campaigns = [campaigns]
+    if not campaigns:
+        return None, "❌ **No Campaigns Found**", False
+
+    tiers = {
+        item['id']: item.get('attributes', {}).get('title', '')
+        for item in data.get('included', []) if item.get('type') == 'tier'
+    }
+    metrics.incr("patreon.campaign_fetches")
+    return {
+        'id': campaigns[0]['id'],
+        'name': campaigns[0].get('attributes', {}).get('creation_name', 'Unknown'),
+        'tiers': tiers
+    }, None, True
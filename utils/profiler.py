@@ -0,0 +1,81 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+from utils.metrics import metrics
+
+# Frames the loop thread sits in while it waits for I/O
+IDLE_FUNCTIONS = {'select', 'poll'}
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """Samples the event loop thread's stack from a background thread
+
+    Samples are aggregated into collapsed stacks ("outer;inner count" per
+    line), the input format of flamegraph.pl and speedscope. Only one
+    profile runs at a time and every run is bounded, so the cost is one
+    stack walk every `interval` seconds while it is on.
+    """
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, seconds: float, include_idle: bool = False) -> Optional[bytes]:
+        """Profile the running loop for `seconds`, None if a profile is already running"""
+        if not self._lock.acquire(blocking=False):
+            return None
+
+        try:
+            stop = threading.Event()
+            stacks: Counter = Counter()
+            thread = threading.Thread(
+                target=self._sample,
+                args=(threading.get_ident(), stop, stacks, include_idle),
+                name='profiler',
+                daemon=True
+            )
+            started = time.monotonic()
+            thread.start()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                stop.set()
+                await asyncio.get_running_loop().run_in_executor(None, thread.join)
+        finally:
+            self._lock.release()
+
+        samples = sum(stacks.values())
+        metrics.incr("profiler.samples", samples)
+        print(f"[PROFILER] {samples} samples, {len(stacks)} distinct stacks in {time.monotonic() - started:.1f}s")
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()).encode()
+
+    def _sample(self, thread_id: int, stop: threading.Event, stacks: Counter, include_idle: bool):
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+
+            names = []
+            while frame is not None and len(names) < self.max_depth:
+                names.append(_frame_name(frame))
+                frame = frame.f_back
+            del frame
+
+            if not include_idle and names and names[0].split(' ', 1)[0] in IDLE_FUNCTIONS:
+                stacks['<idle>'] += 1
+                continue
+            stacks[";".join(reversed(names))] += 1
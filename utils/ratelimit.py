@@ -0,0 +1,111 @@
+import functools
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Set, Tuple
+
+import discord
+
+from utils.metrics import metrics
+
+
+class TokenBucket:
+    """Per-user token bucket: `capacity` burst, refilled at `rate` tokens per second
+
+    Buckets live in memory unless `backend` is set to a shared state
+    backend, in which case every bot process draws from the same bucket.
+    """
+    def __init__(self, rate: float, capacity: int, name: str = 'bucket', max_keys: int = 10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.name = name
+        self.max_keys = max_keys
+        self.backend = None
+        self._buckets: Dict[int, Tuple[float, float]] = {}
+
+    async def acquire(self, key: int, cost: int = 1) -> float:
+        """Take `cost` tokens, returns 0 on success or seconds until enough tokens"""
+        if self.backend is not None and self.backend.shared:
+            return await self.backend.take_tokens(f"{self.name}:{key}", self.rate, self.capacity, cost)
+
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - last) * self.rate)
+
+        if tokens < cost:
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / self.rate
+
+        self._buckets[key] = (tokens - cost, now)
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return 0.0
+
+    def _prune(self, now: float):
+        """Drop buckets that have refilled completely, they behave like new ones"""
+        full_after = self.capacity / self.rate
+        self._buckets = {
+            key: state for key, state in self._buckets.items()
+            if now - state[1] < full_after
+        }
+
+
+class InFlightGuard:
+    """Allows only one operation in flight per user"""
+    def __init__(self):
+        self._active: Set[int] = set()
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._active
+
+    def __len__(self):
+        return len(self._active)
+
+    @contextmanager
+    def hold(self, key: int):
+        self._active.add(key)
+        try:
+            yield
+        finally:
+            self._active.discard(key)
+
+
+def rate_limited(bucket: TokenBucket, name: str, cost: int = 1, guard: Optional[InFlightGuard] = None):
+    """Decorator for `callback(self, interaction)` methods of views and buttons"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
+            user_id = interaction.user.id
+
+            if guard is not None and user_id in guard:
+                metrics.incr(f"ratelimit.{name}.rejected_in_flight")
+                await _reject(interaction, "⏳ **Already Sending**: Please wait for your current download to finish.")
+                return
+
+            retry_after = await bucket.acquire(user_id, cost)
+            if retry_after:
+                metrics.incr(f"ratelimit.{name}.rejected")
+                await _reject(interaction, f"⏳ **Slow Down**: Try again in {retry_after:.0f}s.")
+                return
+
+            metrics.incr(f"ratelimit.{name}.allowed")
+            if guard is None:
+                return await func(self, interaction, *args, **kwargs)
+
+            try:
+                with guard.hold(user_id):
+                    metrics.set_gauge(f"ratelimit.{name}.in_flight", len(guard))
+                    return await func(self, interaction, *args, **kwargs)
+            finally:
+                metrics.set_gauge(f"ratelimit.{name}.in_flight", len(guard))
+        return wrapper
+    return decorator
+
+
+async def _reject(interaction: discord.Interaction, message: str):
+    try:
+        if not interaction.response.is_done():
+            await interaction.response.send_message(message, ephemeral=True)
+        else:
+            await interaction.followup.send(message, ephemeral=True)
+    except:
+        pass
@@ -0,0 +1,117 @@
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class TierCatalog:
+    """Assigns each tier title a bit so a user's tiers fit in one int"""
+    def __init__(self):
+        self._bits: Dict[str, int] = {}
+        self._titles: List[str] = []
+
+    def register(self, title: str) -> int:
+        """Bit for a tier title, unknown titles get the next free bit"""
+        bit = self._bits.get(title)
+        if bit is None:
+            bit = 1 << len(self._titles)
+            title = sys.intern(title)
+            self._bits[title] = bit
+            self._titles.append(title)
+        return bit
+
+    def mask_for(self, titles: List[str]) -> int:
+        mask = 0
+        for title in titles:
+            mask |= self.register(title)
+        return mask
+
+    def titles_for(self, mask: int) -> List[str]:
+        return [title for i, title in enumerate(self._titles) if mask >> i & 1]
+
+    def bit_for(self, title: str) -> int:
+        return self._bits.get(title, 0)
+
+
+# Shared catalog, the cog registers its file tiers first
+tier_catalog = TierCatalog()
+
+
+def to_epoch(value) -> Optional[int]:
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    return int(datetime.fromisoformat(value).timestamp())
+
+
+def to_iso(value: Optional[int]) -> Optional[str]:
+    return datetime.fromtimestamp(value).isoformat() if value is not None else None
+
+
+class UserRecord:
+    """Compact in-memory user record
+
+    Tiers are a bitmask over `tier_catalog`, timestamps are epoch seconds
+    and emails are interned. Records are treated as immutable: change a
+    copy and store it again. `to_dict` gives the user_data.json format.
+    """
+    __slots__ = ('discord_id', 'email', 'tier_mask', 'verified_at', 'ban_expiry', 'access_expiry', 'granted_by', 'extra')
+
+    def __init__(self, discord_id: int, email: Optional[str] = None, tier_mask: int = 0,
+                 verified_at: Optional[int] = None, ban_expiry: Optional[int] = None,
+                 access_expiry: Optional[int] = None, granted_by: Optional[int] = None,
+                 extra: Optional[dict] = None):
+        self.discord_id = discord_id
+        self.email = sys.intern(email) if email else email
+        self.tier_mask = tier_mask
+        self.verified_at = verified_at
+        self.ban_expiry = ban_expiry
+        self.access_expiry = access_expiry
+        self.granted_by = granted_by
+        self.extra = extra
+
+    @property
+    def tiers(self) -> List[str]:
+        return tier_catalog.titles_for(self.tier_mask)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'UserRecord':
+        known = ('discord_id', 'email', 'tiers', 'verified_at', 'ban_expiry', 'access_expiry', 'granted_by')
+        extra = {k: v for k, v in data.items() if k not in known}
+        return cls(
+            discord_id=int(data['discord_id']) if data.get('discord_id') is not None else 0,
+            email=data.get('email'),
+            tier_mask=tier_catalog.mask_for(data.get('tiers', [])),
+            verified_at=to_epoch(data.get('verified_at')),
+            ban_expiry=to_epoch(data.get('ban_expiry')),
+            access_expiry=to_epoch(data.get('access_expiry')),
+            granted_by=data.get('granted_by'),
+            extra=extra or None
+        )
+
+    def to_dict(self) -> dict:
+        data = {
+            'discord_id': self.discord_id,
+            'email': self.email,
+            'tiers': self.tiers
+        }
+        if self.verified_at is not None:
+            data['verified_at'] = to_iso(self.verified_at)
+        if self.granted_by is not None:
+            data['granted_by'] = self.granted_by
+        if self.ban_expiry is not None:
+            data['ban_expiry'] = to_iso(self.ban_expiry)
+        if self.access_expiry is not None:
+            data['access_expiry'] = to_iso(self.access_expiry)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def expiry_fields(self) -> dict:
+        """ISO expiry fields, as stored in user_data.json"""
+        fields = {}
+        if self.ban_expiry is not None:
+            fields['ban_expiry'] = to_iso(self.ban_expiry)
+        if self.access_expiry is not None:
+            fields['access_expiry'] = to_iso(self.access_expiry)
+        return fields
@@ -0,0 +1,36 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from utils.metrics import metrics
+
+
+class RenderCache:
+    """LRU cache of pre-built embeds and view layouts
+
+    Cached values are shared between responses and must not be mutated,
+    copy an embed before adding per-user parts. `invalidate` drops
+    everything.
+    """
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Any]' = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        try:
+            value = self._entries[key]
+        except KeyError:
+            metrics.incr("render.misses")
+            value = self._entries[key] = build()
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return value
+
+        metrics.incr("render.hits")
+        self._entries.move_to_end(key)
+        return value
+
+    def invalidate(self):
+        self._entries.clear()
@@ -0,0 +1,99 @@
+import asyncio
+from typing import Dict, List, Optional
+
+import discord
+
+from utils.metrics import metrics
+from utils.records import tier_catalog
+from utils.sender import SendScheduler, LOG
+
+
+class RoleSync:
+    """Mirrors Patreon tiers into Discord roles named `prefix + tier`
+
+    Role edits go through the send scheduler's lowest lane, and bulk syncs
+    pause between batches, so they never hold up interaction responses.
+    The role -> tier bit map of each guild is cached, which lets a
+    member's entitlement be read from the roles sent with the interaction.
+    """
+    def __init__(self, sender: SendScheduler, tiers: List[str], prefix: str = '', batch_size: int = 10, pause: float = 1.0):
+        self.sender = sender
+        self.tiers = tiers
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.pause = pause
+        self._role_bits: Dict[int, Dict[int, int]] = {}
+
+    def invalidate(self, guild_id: int):
+        self._role_bits.pop(guild_id, None)
+
+    def role_bits(self, guild: discord.Guild) -> Dict[int, int]:
+        """Role id -> tier bit for the tier roles that exist in a guild"""
+        bits = self._role_bits.get(guild.id)
+        if bits is None:
+            names = {self.prefix + tier: tier for tier in self.tiers}
+            bits = {role.id: tier_catalog.register(names[role.name]) for role in guild.roles if role.name in names}
+            self._role_bits[guild.id] = bits
+        return bits
+
+    def mask_for_member(self, member: discord.Member) -> int:
+        """Tier mask from a member's roles, 0 when they have no tier role"""
+        bits = self.role_bits(member.guild)
+        mask = 0
+        for role in member.roles:
+            mask |= bits.get(role.id, 0)
+        return mask
+
+    async def ensure_roles(self, guild: discord.Guild) -> Dict[str, discord.Role]:
+        """Create any missing tier roles, returns tier -> role"""
+        existing = {role.name: role for role in guild.roles}
+        roles = {}
+        for tier in self.tiers:
+            role = existing.get(self.prefix + tier)
+            if role is None:
+                role = await self.sender.submit(LOG, guild.create_role, name=self.prefix + tier, reason="Patreon tier role")
+                metrics.incr("roles.created")
+            roles[tier] = role
+        self.invalidate(guild.id)
+        return roles
+
+    async def sync_member(self, member: discord.Member, tiers: List[str]) -> bool:
+        """Give a member exactly the tier roles for `tiers`, returns True if roles changed"""
+        bits = self.role_bits(member.guild)
+        if not bits:
+            return False
+        wanted = tier_catalog.mask_for(tiers)
+        current = {role.id for role in member.roles if role.id in bits}
+        add = [discord.Object(role_id) for role_id, bit in bits.items() if bit & wanted and role_id not in current]
+        remove = [discord.Object(role_id) for role_id in current if not bits[role_id] & wanted]
+
+        route = f"roles:{member.guild.id}"
+        if add:
+            await self.sender.submit(LOG, member.add_roles, *add, reason="Patreon tier sync", route=route)
+        if remove:
+            await self.sender.submit(LOG, member.remove_roles, *remove, reason="Patreon tier sync", route=route)
+        if add or remove:
+            metrics.incr("roles.members_synced")
+        return bool(add or remove)
+
+    async def sync_all(self, guild: discord.Guild, tiers_by_user: Dict[int, List[str]]) -> tuple[int, int]:
+        """Sync every cached member with a record, in paced batches
+
+        Returns (members changed, members that failed).
+        """
+        members = [member for member in (guild.get_member(user_id) for user_id in tiers_by_user) if member]
+        changed = failed = 0
+        for start in range(0, len(members), self.batch_size):
+            batch = members[start:start + self.batch_size]
+            results = await asyncio.gather(
+                *(self.sync_member(member, tiers_by_user[member.id]) for member in batch),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    print(f"[ROLES] Sync failed: {type(result).__name__}: {result}")
+                    failed += 1
+                elif result:
+                    changed += 1
+            await asyncio.sleep(self.pause)
+        return changed, failed
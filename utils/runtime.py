@@ -0,0 +1,22 @@
+import asyncio
+import os
+
+# Opt-in performance runtime: uvloop and the orjson codec when they are installed
+PERF_RUNTIME = os.getenv('PERF_RUNTIME', '').lower() in ('1', 'true', 'yes')
+
+
+def install_event_loop() -> str:
+    """Make asyncio.run use uvloop when PERF_RUNTIME is on, returns the loop in use
+
+    Call before the bot (or asyncio.run) creates its loop.
+    """
+    if not PERF_RUNTIME:
+        return 'asyncio'
+    try:
+        import uvloop
+    except ImportError:
+        print("[RUNTIME] PERF_RUNTIME is on but uvloop is not installed, using asyncio")
+        return 'asyncio'
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return 'uvloop'
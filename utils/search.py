@@ -0,0 +1,58 @@
+from collections import defaultdict
+from typing import Dict, List, Set
+
+
+def _trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FileIndex:
+    """Prefix + trigram index over a fixed list of file names
+
+    Built once per entitlement and kept in memory, so autocomplete answers
+    with dictionary lookups only. Exact prefixes of the name or of any word
+    in it rank first, then names sharing enough trigrams to catch typos.
+    """
+    def __init__(self, names: List[str], min_similarity: float = 0.25):
+        self.names = list(names)
+        self.min_similarity = min_similarity
+        self._prefixes: Dict[str, List[int]] = defaultdict(list)
+        self._trigrams: Dict[str, List[int]] = defaultdict(list)
+
+        for idx, name in enumerate(self.names):
+            lowered = name.lower()
+            starts = {0} | {i + 1 for i, ch in enumerate(lowered) if ch in ' -_'}
+            prefixes = {lowered[start:end] for start in starts for end in range(start + 1, len(lowered) + 1)}
+            for prefix in prefixes:
+                self._prefixes[prefix].append(idx)
+            for gram in _trigrams(lowered):
+                self._trigrams[gram].append(idx)
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query: str, limit: int = 25) -> List[str]:
+        query = query.strip().lower()
+        if not query:
+            return self.names[:limit]
+
+        # Prefix hits, names that start with the query before word matches
+        hits = sorted(self._prefixes.get(query, ()), key=lambda idx: (not self.names[idx].lower().startswith(query), idx))
+        if len(hits) >= limit:
+            return [self.names[idx] for idx in hits[:limit]]
+
+        grams = _trigrams(query)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for idx in self._trigrams.get(gram, ()):
+                shared[idx] += 1
+
+        seen = set(hits)
+        fuzzy = [
+            (count / len(grams), idx) for idx, count in shared.items()
+            if idx not in seen and count / len(grams) >= self.min_similarity
+        ]
+        fuzzy.sort(key=lambda item: (-item[0], item[1]))
+        hits.extend(idx for _, idx in fuzzy)
+        return [self.names[idx] for idx in hits[:limit]]
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set
+
+from utils.metrics import metrics
+
+# Priority lanes, lower value is served first
+INTERACTION = 0
+DM = 1
+LOG = 2
+LANE_NAMES = {INTERACTION: 'interaction', DM: 'dm', LOG: 'log'}
+
+
+class _Job:
+    __slots__ = ('func', 'args', 'kwargs', 'route', 'future', 'queued_at')
+
+    def __init__(self, func, args, kwargs, route, future):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.route = route
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+class SendScheduler:
+    """Central scheduler for outbound Discord sends with priority lanes
+
+    At most `max_concurrency` sends run at once. Each lane and each route
+    (e.g. one DM channel) has its own concurrency cap, and the caps of the
+    lower lanes add up to less than the total so interaction responses
+    always have a free slot even while bulk DM uploads are queued.
+    """
+    def __init__(self, max_concurrency: int = 6, lane_limits: Optional[Dict[int, int]] = None, route_limit: int = 1):
+        self.max_concurrency = max_concurrency
+        self.lane_limits = lane_limits or {INTERACTION: max_concurrency, DM: 3, LOG: 1}
+        self.route_limit = route_limit
+        self._lanes: Dict[int, Deque[_Job]] = {lane: deque() for lane in LANE_NAMES}
+        self._lane_active: Dict[int, int] = {lane: 0 for lane in LANE_NAMES}
+        self._route_active: Dict[str, int] = defaultdict(int)
+        self._active = 0
+        # Running sends are referenced here so none is garbage collected mid-send
+        self._tasks: Set[asyncio.Task] = set()
+
+    def enqueue(self, lane: int, func: Callable[..., Awaitable[Any]], *args, route: Optional[str] = None, **kwargs) -> asyncio.Future:
+        """Queue `func(*args, **kwargs)` and return a future for its result"""
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_retrieve_exception)
+        self._lanes[lane].append(_Job(func, args, kwargs, route, future))
+        self._drain()
+        return future
+
+    async def submit(self, lane: int, func: Callable[..., Awaitable[Any]], *args, route: Optional[str] = None, **kwargs) -> Any:
+        """Queue a send and wait for its result"""
+        return await self.enqueue(lane, func, *args, route=route, **kwargs)
+
+    def queue_depth(self, lane: int) -> int:
+        return len(self._lanes[lane])
+
+    def _next_job(self):
+        for lane in sorted(self._lanes):
+            if self._lane_active[lane] >= self.lane_limits[lane]:
+                continue
+            jobs = self._lanes[lane]
+            for job in jobs:
+                if job.route is None or self._route_active[job.route] < self.route_limit:
+                    jobs.remove(job)
+                    return lane, job
+        return None
+
+    def _drain(self):
+        while self._active < self.max_concurrency:
+            picked = self._next_job()
+            if picked is None:
+                break
+            lane, job = picked
+            if job.future.cancelled():
+                continue
+
+            self._active += 1
+            self._lane_active[lane] += 1
+            if job.route is not None:
+                self._route_active[job.route] += 1
+            metrics.observe(f"sender.wait.{LANE_NAMES[lane]}", time.monotonic() - job.queued_at)
+            task = asyncio.create_task(self._run(lane, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        self._update_gauges()
+
+    async def _run(self, lane: int, job: _Job):
+        try:
+            result = await job.func(*job.args, **job.kwargs)
+            metrics.incr(f"sender.sent.{LANE_NAMES[lane]}")
+            if not job.future.done():
+                job.future.set_result(result)
+        except Exception as e:
+            metrics.incr(f"sender.errors.{LANE_NAMES[lane]}")
+            if not job.future.done():
+                job.future.set_exception(e)
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+        finally:
+            self._active -= 1
+            self._lane_active[lane] -= 1
+            if job.route is not None:
+                self._route_active[job.route] -= 1
+                if not self._route_active[job.route]:
+                    del self._route_active[job.route]
+            self._drain()
+
+    def _update_gauges(self):
+        for lane, name in LANE_NAMES.items():
+            metrics.set_gauge(f"sender.queue_depth.{name}", len(self._lanes[lane]))
+            metrics.set_gauge(f"sender.active.{name}", self._lane_active[lane])
+
+
+def _retrieve_exception(future: asyncio.Future):
+    """Fire-and-forget sends must not warn about unretrieved exceptions"""
+    if not future.cancelled():
+        future.exception()
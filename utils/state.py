@@ -0,0 +1,435 @@
+import copy
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from utils.codec import codec
+from utils.records import UserRecord, to_epoch
+from utils.storage import storage, read_json, write_json
+from utils.writebehind import WriteBehindBuffer, SYNC
+
+EXPIRY_FIELDS = ('ban_expiry', 'access_expiry')
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, capacity: int) -> float:
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+def _new_record(user_id: str, defaults: Optional[dict]) -> dict:
+    return {'discord_id': int(user_id), 'tiers': [], **(defaults or {})}
+
+
+def _apply(record: dict, fields: dict) -> dict:
+    """Copy of `record` with `fields` set, None values remove the field"""
+    record = dict(record)
+    for key, value in fields.items():
+        if value is None:
+            record.pop(key, None)
+        else:
+            record[key] = value
+    return record
+
+
+class _Patch:
+    """Field-level update waiting in the write-behind buffer, for a record not read yet
+
+    `base` is the record it starts from if none exists by the time it is written.
+    """
+    __slots__ = ('fields', 'base')
+
+    def __init__(self, fields: dict, base: dict):
+        self.fields = fields
+        self.base = base
+
+    def merged(self, fields: dict) -> '_Patch':
+        return _Patch({**self.fields, **fields}, self.base)
+
+    def applied_to(self, record: Optional[dict]) -> dict:
+        return _apply(record if record is not None else self.base, self.fields)
+
+
+def _merge_pending(old: Any, new: Any) -> Any:
+    """A failed queued write combined with a newer one for the same user"""
+    if not isinstance(new, _Patch):
+        return new
+    if isinstance(old, _Patch):
+        return old.merged(new.fields)
+    return _apply(old, new.fields)
+
+
+class StateBackend:
+    """Where user records, shared caches and rate limits live
+
+    `shared` is True when several bot processes can use the same backend,
+    in which case in-memory copies must be resynced from it periodically.
+    Blocking I/O runs in the shared storage thread pool.
+    """
+    shared = False
+
+    async def open(self):
+        pass
+
+    async def load_users(self) -> Dict[str, dict]:
+        raise NotImplementedError
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def get_record(self, user_id: str) -> Optional[UserRecord]:
+        """Compact form of a user's record, for entitlement checks"""
+        record = await self.get_user(user_id)
+        return UserRecord.from_dict(record) if record is not None else None
+
+    def cached_record(self, user_id: str) -> Optional[UserRecord]:
+        """Record if it can be read without any I/O, otherwise None"""
+        return None
+
+    async def put_users(self, records: Dict[str, dict]):
+        raise NotImplementedError
+
+    async def update_user(self, user_id: str, fields: dict, defaults: Optional[dict] = None):
+        await self.update_users({user_id: fields}, defaults)
+
+    async def update_users(self, updates: Dict[str, dict], defaults: Optional[dict] = None):
+        """Set fields of several records in place, a None value removes the field
+
+        Unlike put_users the other fields are kept, so processes changing
+        different fields of a record never undo each other. Missing records
+        are created from `defaults`.
+        """
+        raise NotImplementedError
+
+    async def clear_field(self, user_id: str, field: str, expected: Any = None) -> bool:
+        """Remove a field from a record, only if it still has `expected` when given"""
+        raise NotImplementedError
+
+    async def load_expiries(self) -> Dict[str, dict]:
+        """Ban / access expiry fields of every record that has one"""
+        expiries = {}
+        for user_id, record in (await self.load_users()).items():
+            fields = {k: record[k] for k in EXPIRY_FIELDS if record.get(k)}
+            if fields:
+                expiries[user_id] = fields
+        return expiries
+
+    async def get_value(self, namespace: str, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    async def set_value(self, namespace: str, key: str, value: Any):
+        raise NotImplementedError
+
+    async def delete_value(self, namespace: str, key: str):
+        raise NotImplementedError
+
+    async def take_tokens(self, key: str, rate: float, capacity: int, cost: int = 1) -> float:
+        """Token bucket shared through the backend, returns 0 or seconds to wait"""
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+class JSONStateBackend(StateBackend):
+    """Single-process backend: user_data.json plus a JSON file for other state
+
+    Records are served from memory as compact UserRecords. Records are
+    replaced, never mutated in place, so a shallow copy of the table is a
+    consistent snapshot to write. Mutations are batched so a burst of them
+    costs a single file rewrite.
+    """
+    def __init__(self, user_data_file: str = 'user_data.json', state_file: str = 'bot_state.json',
+                 flush_interval: float = 0.25, durability: str = SYNC):
+        self.user_data_file = user_data_file
+        self.state_file = state_file
+        self._users: Dict[str, UserRecord] = {}
+        self._values: Dict[str, Dict[str, Any]] = {}
+        self._buckets: Dict[str, tuple] = {}
+        self._buffer = WriteBehindBuffer(self._flush_users, flush_interval, durability)
+
+    async def open(self):
+        users = await storage.run(read_json, self.user_data_file, {})
+        self._users = {user_id: UserRecord.from_dict(record) for user_id, record in users.items()}
+        self._values = await storage.run(read_json, self.state_file, {})
+
+    async def _flush_users(self, batch: Dict[str, UserRecord]):
+        await storage.serialized(self.user_data_file, _write_users, self.user_data_file, dict(self._users))
+
+    async def _save_values(self):
+        await storage.write_json(self.state_file, {ns: dict(values) for ns, values in self._values.items()})
+
+    async def load_users(self) -> Dict[str, dict]:
+        return {user_id: record.to_dict() for user_id, record in self._users.items()}
+
+    async def load_expiries(self) -> Dict[str, dict]:
+        expiries = {}
+        for user_id, record in self._users.items():
+            fields = record.expiry_fields()
+            if fields:
+                expiries[user_id] = fields
+        return expiries
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        record = self._users.get(user_id)
+        return record.to_dict() if record is not None else None
+
+    async def get_record(self, user_id: str) -> Optional[UserRecord]:
+        return self._users.get(user_id)
+
+    def cached_record(self, user_id: str) -> Optional[UserRecord]:
+        return self._users.get(user_id)
+
+    async def put_users(self, records: Dict[str, dict]):
+        records = {user_id: UserRecord.from_dict(record) for user_id, record in records.items()}
+        self._users.update(records)
+        await self._buffer.put(records)
+
+    async def update_users(self, updates: Dict[str, dict], defaults: Optional[dict] = None):
+        records = {}
+        for user_id, fields in updates.items():
+            record = self._users.get(user_id)
+            data = record.to_dict() if record is not None else _new_record(user_id, defaults)
+            records[user_id] = UserRecord.from_dict(_apply(data, fields))
+        self._users.update(records)
+        await self._buffer.put(records)
+
+    async def clear_field(self, user_id: str, field: str, expected: Any = None) -> bool:
+        record = self._users.get(user_id)
+        if field not in EXPIRY_FIELDS:
+            raise ValueError(f"Cannot clear field '{field}'")
+        if not record or getattr(record, field) is None:
+            return False
+        if expected is not None and getattr(record, field) != to_epoch(expected):
+            return False
+        record = copy.copy(record)
+        setattr(record, field, None)
+        self._users[user_id] = record
+        await self._buffer.put({user_id: record})
+        return True
+
+    async def get_value(self, namespace: str, key: str, default: Any = None) -> Any:
+        return self._values.get(namespace, {}).get(key, default)
+
+    async def set_value(self, namespace: str, key: str, value: Any):
+        self._values.setdefault(namespace, {})[key] = value
+        await self._save_values()
+
+    async def delete_value(self, namespace: str, key: str):
+        if self._values.get(namespace, {}).pop(key, None) is not None:
+            await self._save_values()
+
+    async def take_tokens(self, key: str, rate: float, capacity: int, cost: int = 1) -> float:
+        now = time.time()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = _refill(tokens, updated, now, rate, capacity)
+        if tokens < cost:
+            self._buckets[key] = (tokens, now)
+            return (cost - tokens) / rate
+        self._buckets[key] = (tokens - cost, now)
+        return 0.0
+
+    async def close(self):
+        await self._buffer.close()
+
+
+def _write_users(path: str, users: Dict[str, UserRecord]):
+    write_json(path, {user_id: record.to_dict() for user_id, record in users.items()})
+
+
+class SQLiteStateBackend(StateBackend):
+    """Backend shared by several bot processes through one SQLite database"""
+    shared = True
+
+    def __init__(self, path: str = 'bot_state.db', flush_interval: float = 0.25, durability: str = SYNC):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._buffer = WriteBehindBuffer(self._flush_users, flush_interval, durability, merge=_merge_pending)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, data TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS kv (namespace TEXT, key TEXT, value TEXT NOT NULL, PRIMARY KEY (namespace, key));
+            CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL);
+        """)
+        self._conn = conn
+
+    async def open(self):
+        await storage.run(self._connect)
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _transaction(self, func):
+        """Run func(conn) in a write transaction, serialised across processes"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._conn)
+            except:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    async def _flush_users(self, batch: Dict[str, Any]):
+        records = [(user_id, codec.dumps(record)) for user_id, record in batch.items() if not isinstance(record, _Patch)]
+        # Field-level updates are merged into the stored record by SQLite, so a
+        # field written by another process since we last read it is kept
+        patches = [
+            (user_id, codec.dumps(patch.base), codec.dumps(patch.fields))
+            for user_id, patch in batch.items() if isinstance(patch, _Patch)
+        ]
+        def write(conn):
+            conn.executemany(
+                "INSERT INTO users (id, data) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET data = excluded.data", records
+            )
+            conn.executemany(
+                "INSERT INTO users (id, data) VALUES (?1, json_patch(?2, ?3)) "
+                "ON CONFLICT(id) DO UPDATE SET data = json_patch(users.data, ?3)", patches
+            )
+        await storage.run(self._transaction, write)
+
+    async def load_users(self) -> Dict[str, dict]:
+        await self._buffer.flush()
+        rows = await storage.run(self._query, "SELECT id, data FROM users")
+        return {user_id: codec.loads(data) for user_id, data in rows}
+
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        return (await self.get_users([user_id])).get(user_id)
+
+    async def get_users(self, user_ids: List[str]) -> Dict[str, dict]:
+        pending = {user_id: self._buffer.get(user_id) for user_id in user_ids if user_id in self._buffer}
+        records = {user_id: dict(record) for user_id, record in pending.items() if not isinstance(record, _Patch)}
+        missing = [user_id for user_id in user_ids if user_id not in records]
+        if missing:
+            rows = await storage.run(
+                self._query,
+                "SELECT id, data FROM users WHERE id IN (SELECT value FROM json_each(?))",
+                (codec.dumps(missing),)
+            )
+            stored = {user_id: codec.loads(data) for user_id, data in rows}
+            # Reads see field updates that are not flushed yet
+            for user_id in missing:
+                patch = pending.get(user_id)
+                if patch is not None:
+                    stored[user_id] = patch.applied_to(stored.get(user_id))
+            records.update(stored)
+        return records
+
+    def cached_record(self, user_id: str) -> Optional[UserRecord]:
+        # Only whole records still waiting in the write-behind buffer are in memory
+        record = self._buffer.get(user_id, None)
+        if record is None or isinstance(record, _Patch):
+            return None
+        return UserRecord.from_dict(record)
+
+    async def put_users(self, records: Dict[str, dict]):
+        await self._buffer.put({user_id: dict(record) for user_id, record in records.items()})
+
+    async def update_users(self, updates: Dict[str, dict], defaults: Optional[dict] = None):
+        pending = {}
+        for user_id, fields in updates.items():
+            queued = self._buffer.get(user_id, None)
+            if queued is None:
+                pending[user_id] = _Patch(dict(fields), _new_record(user_id, defaults))
+            elif isinstance(queued, _Patch):
+                pending[user_id] = queued.merged(fields)
+            else:
+                # A whole record is already queued, it absorbs the update
+                pending[user_id] = _apply(queued, fields)
+        await self._buffer.put(pending)
+
+    async def clear_field(self, user_id: str, field: str, expected: Any = None) -> bool:
+        # Conditional updates go straight to the database so processes agree on them
+        await self._buffer.flush()
+        def clear(conn):
+            row = conn.execute("SELECT data FROM users WHERE id = ?", (user_id,)).fetchone()
+            if not row:
+                return False
+            record = codec.loads(row[0])
+            if field not in record or (expected is not None and to_epoch(record[field]) != to_epoch(expected)):
+                return False
+            del record[field]
+            conn.execute("UPDATE users SET data = ? WHERE id = ?", (codec.dumps(record), user_id))
+            return True
+        return await storage.run(self._transaction, clear)
+
+    async def load_expiries(self) -> Dict[str, dict]:
+        await self._buffer.flush()
+        rows = await storage.run(
+            self._query,
+            "SELECT id, json_extract(data, '$.ban_expiry'), json_extract(data, '$.access_expiry') FROM users "
+            "WHERE json_extract(data, '$.ban_expiry') IS NOT NULL OR json_extract(data, '$.access_expiry') IS NOT NULL"
+        )
+        expiries = {}
+        for user_id, ban_expiry, access_expiry in rows:
+            fields = dict(zip(EXPIRY_FIELDS, (ban_expiry, access_expiry)))
+            expiries[user_id] = {k: v for k, v in fields.items() if v}
+        return expiries
+
+    async def get_value(self, namespace: str, key: str, default: Any = None) -> Any:
+        rows = await storage.run(self._query, "SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, key))
+        return codec.loads(rows[0][0]) if rows else default
+
+    async def set_value(self, namespace: str, key: str, value: Any):
+        data = codec.dumps(value)
+        await storage.run(self._transaction, lambda conn: conn.execute(
+            "INSERT INTO kv (namespace, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value",
+            (namespace, key, data)
+        ))
+
+    async def delete_value(self, namespace: str, key: str):
+        await storage.run(self._transaction, lambda conn: conn.execute(
+            "DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+        ))
+
+    async def take_tokens(self, key: str, rate: float, capacity: int, cost: int = 1) -> float:
+        def take(conn):
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, rate, capacity) if row else capacity
+            wait = 0.0
+            if tokens < cost:
+                wait = (cost - tokens) / rate
+            else:
+                tokens -= cost
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now)
+            )
+            return wait
+        return await storage.run(self._transaction, take)
+
+    async def close(self):
+        try:
+            await self._buffer.close()
+        finally:
+            if self._conn is not None:
+                await storage.run(self._conn.close)
+
+
+def create_backend(spec: Optional[str] = None) -> StateBackend:
+    """Build a backend from a spec like `json` (default) or `sqlite:bot_state.db`
+
+    WRITE_DURABILITY (`sync` or `async`) and WRITE_BEHIND_MS control how
+    user record mutations are batched.
+    """
+    spec = spec or os.getenv('STATE_BACKEND', 'json')
+    options = {
+        'flush_interval': int(os.getenv('WRITE_BEHIND_MS', '250')) / 1000,
+        'durability': os.getenv('WRITE_DURABILITY', SYNC)
+    }
+    kind, _, path = spec.partition(':')
+    if kind == 'sqlite':
+        return SQLiteStateBackend(path or 'bot_state.db', **options)
+    if kind == 'json':
+        return JSONStateBackend(**options)
+    raise ValueError(f"Unknown STATE_BACKEND '{spec}'")
@@ -0,0 +1,113 @@
+import asyncio
+import functools
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from utils.codec import codec
+
+
+def atomic_write(path: str, data: bytes):
+    """Write to a temp file then rename it over `path`, so readers never see a partial file"""
+    # Unique name in the same directory, so concurrent writers never share a temp file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix=f"{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'rb') as f:
+            return codec.loads(f.read())
+    except:
+        return default
+
+
+def write_json(path: str, data: Any):
+    atomic_write(path, codec.encode(data, indent=True))
+
+
+class FileWriter:
+    """Runs every write to one file in order through a single task"""
+    def __init__(self, storage: 'AsyncStorage', path: str):
+        self.storage = storage
+        self.path = path
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def submit(self, func: Callable, *args) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((func, args, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            func, args, future = await self._queue.get()
+            try:
+                result = await self.storage.run(func, *args)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def drain(self):
+        await self._queue.join()
+
+    def stop(self):
+        self._task.cancel()
+
+
+class AsyncStorage:
+    """Keeps blocking disk I/O off the event loop
+
+    Reads run in a dedicated thread pool. Writes to the same file are
+    serialised through one FileWriter task and land atomically.
+    """
+    def __init__(self, max_workers: int = 4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='storage')
+        self._writers: Dict[str, FileWriter] = {}
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run a blocking function in the storage thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args))
+
+    def writer(self, path: str) -> FileWriter:
+        if path not in self._writers:
+            self._writers[path] = FileWriter(self, path)
+        return self._writers[path]
+
+    async def serialized(self, path: str, func: Callable, *args) -> Any:
+        """Run a read-modify-write of `path` in order with every other write to it"""
+        return await self.writer(path).submit(func, *args)
+
+    async def read_json(self, path: str, default: Any = None) -> Any:
+        return await self.run(read_json, path, default)
+
+    async def write_json(self, path: str, data: Any):
+        """Atomically write JSON, `data` must not be mutated until this returns"""
+        await self.serialized(path, write_json, path, data)
+
+    async def close(self):
+        """Wait for queued writes to land, then stop the writers"""
+        for writer in list(self._writers.values()):
+            await writer.drain()
+            writer.stop()
+        self._writers.clear()
+
+
+# Shared storage used across the bot
+storage = AsyncStorage()
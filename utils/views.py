@@ -0,0 +1,71 @@
+import sys
+from collections import OrderedDict
+from typing import Hashable, Union
+
+import discord
+
+from utils.metrics import metrics
+
+
+TrackedView = Union[discord.ui.View, discord.ui.Modal]
+
+
+def _view_size(view: TrackedView) -> int:
+    """Rough memory footprint of a view and its items"""
+    return sys.getsizeof(view) + sum(sys.getsizeof(item) for item in view.children)
+
+
+class ViewRegistry:
+    """Caps how many per-user views / modals discord.py keeps alive
+
+    Views are tracked per (user, kind). Sending a new view of the same kind
+    stops the one it supersedes, and once `max_live` views are live the
+    least recently used is stopped. A stopped view leaves discord.py's view
+    store and its timeout task, so it can be freed.
+    """
+    def __init__(self, max_live: int = 1000):
+        self.max_live = max_live
+        self._views: 'OrderedDict[Hashable, TrackedView]' = OrderedDict()
+        self._sizes: dict = {}
+        self._memory = 0
+
+    def __len__(self):
+        return len(self._views)
+
+    def track(self, user_id: int, kind: str, view: TrackedView):
+        self._prune()
+        key = (user_id, kind)
+        old = self._views.pop(key, None)
+        self._memory -= self._sizes.pop(key, 0)
+        if old is not None and old is not view:
+            self._stop(old)
+            metrics.incr("views.superseded")
+
+        self._views[key] = view
+        self._sizes[key] = _view_size(view)
+        self._memory += self._sizes[key]
+
+        while len(self._views) > self.max_live:
+            oldest, evicted = self._views.popitem(last=False)
+            self._memory -= self._sizes.pop(oldest, 0)
+            if not evicted.is_finished():
+                self._stop(evicted)
+                metrics.incr("views.evicted")
+
+        metrics.set_gauge("views.live", len(self._views))
+        metrics.set_gauge("views.memory_bytes", self._memory)
+
+    def _prune(self):
+        """Forget views that timed out, oldest first"""
+        while self._views:
+            key, view = next(iter(self._views.items()))
+            if not view.is_finished():
+                break
+            del self._views[key]
+            self._memory -= self._sizes.pop(key, 0)
+
+    def _stop(self, view: TrackedView):
+        try:
+            view.stop()
+        except Exception as e:
+            print(f"[VIEWS] Could not stop {type(view).__name__}: {e}")
@@ -0,0 +1,160 @@
+import asyncio
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from utils.metrics import metrics
+
+# Durability modes
+SYNC = 'sync'    # callers wait until the batch holding their change is written
+ASYNC = 'async'  # callers return at once, a crash can lose the last interval
+
+_MISSING = object()
+
+# Failed flushes are retried after a delay doubling up to this many seconds
+MAX_RETRY_DELAY = 30.0
+
+# SYNC callers get the error once their batch failed this many flushes in a row
+MAX_ATTEMPTS = 5
+
+
+class WriteBehindBuffer:
+    """Collects record mutations and flushes them together every `interval` seconds
+
+    A failed batch goes back in the buffer and is retried with backoff.
+    SYNC callers keep waiting through up to `max_attempts` failed flushes,
+    then get the flush error while the data stays queued for the next
+    retry. `merge(old, new)` combines a failed value with a newer one for
+    the same key, the newer one wins by default.
+    """
+    def __init__(self, flush_func: Callable[[Dict[str, Any]], Awaitable[None]], interval: float = 0.25,
+                 durability: str = SYNC, name: str = 'users', merge: Optional[Callable[[Any, Any], Any]] = None,
+                 max_attempts: int = MAX_ATTEMPTS):
+        if durability not in (SYNC, ASYNC):
+            raise ValueError(f"Unknown durability mode '{durability}'")
+        self.flush_func = flush_func
+        self.interval = interval
+        self.durability = durability
+        self.name = name
+        self.merge = merge or (lambda old, new: new)
+        self.max_attempts = max_attempts
+        self._retry_delay = 0.0
+        self._attempts = 0
+        self._pending: Dict[str, Any] = {}
+        self._first_at: Optional[float] = None
+        self._batch_future: Optional[asyncio.Future] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+    def get(self, key: str, default: Any = _MISSING) -> Any:
+        """Pending value for a key, so reads see writes that are not flushed yet"""
+        return self._pending.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._pending
+
+    def __len__(self):
+        return len(self._pending)
+
+    async def put(self, updates: Dict[str, Any]):
+        self._pending.update(updates)
+        metrics.incr(f"writebehind.{self.name}.mutations", len(updates))
+        future = self._schedule()
+        if self.durability == SYNC:
+            await asyncio.shield(future)
+
+    def _schedule(self) -> asyncio.Future:
+        if self._batch_future is None:
+            self._first_at = time.monotonic()
+            self._batch_future = asyncio.get_running_loop().create_future()
+            self._batch_future.add_done_callback(_retrieve_exception)
+            self._timer = asyncio.create_task(self._flush_later())
+        return self._batch_future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self._retry_delay or self.interval)
+        await self.flush()
+
+    async def flush(self):
+        """Write everything pending as one batch"""
+        async with self._flush_lock:
+            if self._batch_future is None:
+                return
+
+            batch, self._pending = self._pending, {}
+            future, self._batch_future = self._batch_future, None
+            first_at, self._first_at = self._first_at, None
+            timer, self._timer = self._timer, None
+            if timer is not None and timer is not asyncio.current_task():
+                timer.cancel()
+
+            started = time.monotonic()
+            try:
+                await self.flush_func(batch)
+            except Exception as e:
+                self._retry_delay = min(max(self._retry_delay * 2, self.interval), MAX_RETRY_DELAY)
+                print(f"[WRITE-BEHIND] Flush of {len(batch)} {self.name} failed, retrying in {self._retry_delay:.1f}s: {e}")
+                metrics.incr(f"writebehind.{self.name}.errors")
+                # Put the failed batch back under any newer values, its callers
+                # wait for the flush that writes it
+                for key, value in batch.items():
+                    self._pending[key] = self.merge(value, self._pending[key]) if key in self._pending else value
+                retry = self._schedule()
+                self._first_at = min(first_at, self._first_at)
+                self._attempts += 1
+                if self._attempts >= self.max_attempts:
+                    # Stop holding callers, their data is still retried
+                    self._attempts = 0
+                    future.set_exception(e)
+                else:
+                    retry.add_done_callback(functools.partial(_resolve, future))
+                return
+
+            self._retry_delay = 0.0
+            self._attempts = 0
+            now = time.monotonic()
+            metrics.incr(f"writebehind.{self.name}.flushes")
+            metrics.observe(f"writebehind.{self.name}.write_time", now - started)
+            metrics.observe(f"writebehind.{self.name}.flush_latency", now - first_at)
+            metrics.set_gauge(f"writebehind.{self.name}.last_batch", len(batch))
+            future.set_result(None)
+
+    async def close(self, attempts: int = 5):
+        """Flush on shutdown, retrying until the buffer is empty
+
+        Raises if it still holds data after `attempts` flushes, since it
+        would be lost.
+        """
+        for attempt in range(attempts):
+            await self.flush()
+            if self._batch_future is None:
+                return
+            if attempt + 1 < attempts:
+                await asyncio.sleep(self._retry_delay)
+
+        lost = len(self._pending)
+        future, self._batch_future = self._batch_future, None
+        timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        error = RuntimeError(f"{lost} {self.name} could not be written after {attempts} attempts")
+        future.set_exception(error)
+        print(f"[WRITE-BEHIND] {error}, they are lost")
+        raise error
+
+
+def _resolve(target: asyncio.Future, source: asyncio.Future):
+    """Settle `target` the way `source` was settled"""
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(None)
+
+
+def _retrieve_exception(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()